@@ -1,14 +1,52 @@
+import argparse
+import asyncio
+import csv
+import os
+import sys
+import threading
+import time
+import timeit
+import tracemalloc
 from abc import ABC, abstractmethod
+from contextlib import nullcontext
 from datetime import datetime
 
+# regras de negócio compartilhadas com a API (sistema_bancario/domain/rules.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "sistema_bancario"))
+from domain.rules import (  # noqa: E402
+    DEFAULT_POLICY,
+    NO_LIMITS,
+    DailyCounter,
+    RuleViolation,
+    WithdrawalPolicy,
+    check_deposit,
+    check_withdrawal,
+)
+
+MENSAGENS_SAQUE = {
+    RuleViolation.INVALID_AMOUNT: "Valor inválido para saque.",
+    RuleViolation.PER_OPERATION_LIMIT: "Valor do saque excede o limite por operação.",
+    RuleViolation.DAILY_WITHDRAWALS: "Número máximo de saques diários excedido.",
+    RuleViolation.INSUFFICIENT_BALANCE: "Saldo insuficiente.",
+}
+
+
+# As classes _Base* concentram o comportamento e não têm atributos próprios
+# (__slots__ vazio). As versões normais ganham __dict__ por instância; as versões
+# *Compacta/*Compacto declaram __slots__ e ocupam bem menos memória, com a mesma API.
+
 
 class Transacao(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def tipo(self):
         raise NotImplementedError()
 
 
-class Deposito(Transacao):
+class _BaseDeposito(Transacao):
+    __slots__ = ()
+
     def __init__(self, valor):
         self.valor = valor
 
@@ -16,7 +54,17 @@ class Deposito(Transacao):
         return "Depósito"
 
 
-class Saque(Transacao):
+class Deposito(_BaseDeposito):
+    pass
+
+
+class DepositoCompacto(_BaseDeposito):
+    __slots__ = ("valor",)
+
+
+class _BaseSaque(Transacao):
+    __slots__ = ()
+
     def __init__(self, valor):
         self.valor = valor
 
@@ -24,7 +72,17 @@ class Saque(Transacao):
         return "Saque"
 
 
-class Historico:
+class Saque(_BaseSaque):
+    pass
+
+
+class SaqueCompacto(_BaseSaque):
+    __slots__ = ("valor",)
+
+
+class _BaseHistorico:
+    __slots__ = ()
+
     def __init__(self):
         self._transacoes = []
 
@@ -49,13 +107,24 @@ class Historico:
         return "\n".join(lines)
 
 
-class Conta:
+class Historico(_BaseHistorico):
+    pass
+
+
+class HistoricoCompacto(_BaseHistorico):
+    __slots__ = ("_transacoes",)
+
+
+class _BaseConta:
+    __slots__ = ()
+    _classe_historico = Historico
+
     def __init__(self, saldo, numero, agencia, cliente, historico=None):
         self._saldo = saldo
         self._numero = numero
         self._agencia = agencia
         self._cliente = cliente
-        self._historico = historico or Historico()
+        self._historico = historico or self._classe_historico()
 
     @property
     def saldo(self):
@@ -79,20 +148,32 @@ class Conta:
 
     @classmethod
     def nova_conta(cls, cliente, numero, agencia="0001"):
-        return cls(0, numero, agencia, cliente, Historico())
+        return cls(0, numero, agencia, cliente, cls._classe_historico())
+
+    def _politica_saque(self):
+        return NO_LIMITS
+
+    def _saques_hoje(self, hoje):
+        return 0
 
-    def sacar(self, valor):
-        if valor > self._saldo:
-            print("Saldo insuficiente.")
+    def _registrar_saque(self, hoje, valor):
+        pass
+
+    def sacar(self, valor, avisar=print):
+        hoje = datetime.now().date()
+        violacao = check_withdrawal(self._saldo, valor, self._saques_hoje(hoje), self._politica_saque())
+        if violacao:
+            avisar(MENSAGENS_SAQUE[violacao])
             return False
 
         self._saldo -= valor
+        self._registrar_saque(hoje, valor)
         self._historico.adicionar_transacao("Saque", valor)
         return True
 
-    def depositar(self, valor):
-        if valor <= 0:
-            print("Valor inválido para depósito.")
+    def depositar(self, valor, avisar=print):
+        if check_deposit(valor):
+            avisar("Valor inválido para depósito.")
             return False
 
         self._saldo += valor
@@ -100,44 +181,62 @@ class Conta:
         return True
 
 
-class ContaCorrente(Conta):
+class Conta(_BaseConta):
+    pass
+
+
+class ContaCompacta(_BaseConta):
+    __slots__ = ("_saldo", "_numero", "_agencia", "_cliente", "_historico")
+    _classe_historico = HistoricoCompacto
+
+
+class _BaseContaCorrente(_BaseConta):
+    __slots__ = ()
+
     def __init__(self, saldo, numero, agencia, cliente, historico, limite_saques=3, limite=500):
         super().__init__(saldo, numero, agencia, cliente, historico)
-        self._limite_saques = limite_saques
-        self._limite = limite
+        politica = WithdrawalPolicy(per_operation_limit=limite, daily_withdrawals=limite_saques)
+        self._politica = DEFAULT_POLICY if politica == DEFAULT_POLICY else politica
+        # contador de saques do dia, para não percorrer o histórico a cada saque
+        self._saques = DailyCounter()
+        hoje = datetime.now().date()
+        for t in self._historico.transacoes:
+            if t["tipo"] == "Saque" and t["data"].date() == hoje:
+                self._saques.register(hoje, t["valor"])
 
     @property
     def limite_saques(self):
-        return self._limite_saques
+        return self._politica.daily_withdrawals
 
     @property
     def limite(self):
-        return self._limite
+        return self._politica.per_operation_limit
 
     @classmethod
     def criar_conta(cls, cliente, numero, agencia="0001", limite_saques=3, limite=500):
-        return cls(0, numero, agencia, cliente, Historico(), limite_saques, limite)
+        return cls(0, numero, agencia, cliente, cls._classe_historico(), limite_saques, limite)
 
-    def sacar(self, valor):
-        if valor > self._limite:
-            print("Valor do saque excede o limite por operação.")
-            return False
+    def _politica_saque(self):
+        return self._politica
 
-        # conta quantos saques foram feitos hoje
-        saques_hoje = sum(
-            1
-            for t in self.historico.transacoes
-            if t["tipo"] == "Saque" and t["data"].date() == datetime.now().date()
-        )
+    def _saques_hoje(self, hoje):
+        return self._saques.count_for(hoje)
 
-        if saques_hoje >= self._limite_saques:
-            print("Número máximo de saques diários excedido.")
-            return False
+    def _registrar_saque(self, hoje, valor):
+        self._saques.register(hoje, valor)
+
+
+class ContaCorrente(_BaseContaCorrente, Conta):
+    pass
+
+
+class ContaCorrenteCompacta(_BaseContaCorrente, ContaCompacta):
+    __slots__ = ("_politica", "_saques")
 
-        return super().sacar(valor)
 
+class _BaseCliente:
+    __slots__ = ()
 
-class Cliente:
     def __init__(self, endereco):
         self._contas = []
         self._endereco = endereco
@@ -154,7 +253,17 @@ class Cliente:
         self._contas.append(conta)
 
 
-class PessoaFisica(Cliente):
+class Cliente(_BaseCliente):
+    pass
+
+
+class ClienteCompacto(_BaseCliente):
+    __slots__ = ("_contas", "_endereco")
+
+
+class _BasePessoaFisica(_BaseCliente):
+    __slots__ = ()
+
     def __init__(self, nome, cpf, data_nascimento, endereco):
         super().__init__(endereco)
         self._nome = nome
@@ -177,6 +286,14 @@ class PessoaFisica(Cliente):
         return f"{self._nome} (CPF: {self._cpf})"
 
 
+class PessoaFisica(_BasePessoaFisica, Cliente):
+    pass
+
+
+class PessoaFisicaCompacta(_BasePessoaFisica, ClienteCompacto):
+    __slots__ = ("_nome", "_cpf", "_data_nascimento")
+
+
 def menu_principal():
     menu = """\n
     ====== MENU PRINCIPAL ======
@@ -193,32 +310,134 @@ def menu_principal():
     return menu
 
 class Banco:
-    def __init__(self, agencia="0001"):
+    def __init__(self, agencia="0001", concorrente=False, travas=64, compacto=False):
         self._usuarios = {}  # cpf -> PessoaFisica
         self._contas = []
         self._agencia = agencia
+        # modo compacto: objetos com __slots__, para manter milhões de contas em memória
+        self._classe_usuario = PessoaFisicaCompacta if compacto else PessoaFisica
+        self._classe_conta = ContaCorrenteCompacta if compacto else ContaCorrente
+        # modo concorrente: uma trava para cadastros e travas por faixa de contas
+        # (lock striping), assim operações em contas diferentes rodam em paralelo
+        if concorrente:
+            self._trava_cadastro = threading.Lock()
+            self._travas_contas = [threading.Lock() for _ in range(travas)]
+        else:
+            self._trava_cadastro = nullcontext()
+            self._travas_contas = None
 
-    def criar_usuario(self, nome, cpf, data_nascimento, endereco):
-        if cpf in self._usuarios:
-            print("Já existe um usuário com esse CPF!")
-            return None
-        usuario = PessoaFisica(nome, cpf, data_nascimento, endereco)
-        self._usuarios[cpf] = usuario
-        print("Usuário criado com sucesso!")
+    @property
+    def concorrente(self):
+        return self._travas_contas is not None
+
+    def _trava_da_conta(self, numero):
+        if self._travas_contas is None:
+            return self._trava_cadastro
+        return self._travas_contas[numero % len(self._travas_contas)]
+
+    def criar_usuario(self, nome, cpf, data_nascimento, endereco, avisar=print):
+        with self._trava_cadastro:
+            if cpf in self._usuarios:
+                avisar("Já existe um usuário com esse CPF!")
+                return None
+            usuario = self._classe_usuario(nome, cpf, data_nascimento, endereco)
+            self._usuarios[cpf] = usuario
+        avisar("Usuário criado com sucesso!")
         return usuario
 
-    def criar_conta_para_usuario(self, cpf):
-        usuario = self._usuarios.get(cpf)
-        if not usuario:
-            print("Usuário não encontrado, por favor crie um usuário antes de criar uma conta.")
-            return None
-        numero_conta = len(self._contas) + 1
-        conta = ContaCorrente.criar_conta(usuario, numero_conta, agencia=self._agencia)
-        self._contas.append(conta)
-        usuario.adicionar_conta(conta)
-        print(f"Conta criada com sucesso! Número da conta: {numero_conta}")
+    def criar_conta_para_usuario(self, cpf, avisar=print):
+        with self._trava_cadastro:
+            usuario = self._usuarios.get(cpf)
+            if not usuario:
+                avisar("Usuário não encontrado, por favor crie um usuário antes de criar uma conta.")
+                return None
+            numero_conta = len(self._contas) + 1
+            conta = self._classe_conta.criar_conta(usuario, numero_conta, agencia=self._agencia)
+            self._contas.append(conta)
+            usuario.adicionar_conta(conta)
+        avisar(f"Conta criada com sucesso! Número da conta: {numero_conta}")
         return conta
 
+    def depositar(self, numero, valor, avisar=print):
+        conta = self.buscar_conta(numero)
+        if not conta:
+            avisar("Conta não encontrada.")
+            return False
+        with self._trava_da_conta(numero):
+            return conta.depositar(valor, avisar)
+
+    def sacar(self, numero, valor, avisar=print):
+        conta = self.buscar_conta(numero)
+        if not conta:
+            avisar("Conta não encontrada.")
+            return False
+        with self._trava_da_conta(numero):
+            return conta.sacar(valor, avisar)
+
+    def buscar_conta(self, numero):
+        # contas são numeradas sequencialmente a partir de 1, então o número é o índice
+        if 1 <= numero <= len(self._contas):
+            return self._contas[numero - 1]
+        return None
+
+    def executar_lote(self, linhas, guardar_resultados=True):
+        # executa comandos CSV sem o menu interativo, uma operação por linha:
+        #   d,conta,valor | s,conta,valor | u,cpf,nome,data_nascimento,endereco | c,cpf
+        # linhas vazias ou iniciadas por '#' são ignoradas
+        resultados = []
+        resumo = {"total": 0, "sucesso": 0, "falha": 0, "por_operacao": {}}
+        mensagens = []
+        avisar = mensagens.append
+        inicio = time.perf_counter()
+
+        for numero_linha, campos in enumerate(csv.reader(linhas), start=1):
+            if not campos or campos[0].startswith("#"):
+                continue
+
+            opcao = campos[0].strip()
+            mensagens.clear()
+            try:
+                sucesso = self._executar_comando(opcao, campos[1:], avisar)
+            except (ValueError, IndexError):
+                sucesso = False
+                mensagens.append("Linha inválida.")
+
+            resumo["total"] += 1
+            resumo["sucesso" if sucesso else "falha"] += 1
+            contagem = resumo["por_operacao"].setdefault(opcao, {"sucesso": 0, "falha": 0})
+            contagem["sucesso" if sucesso else "falha"] += 1
+
+            if guardar_resultados:
+                resultados.append({
+                    "linha": numero_linha,
+                    "operacao": opcao,
+                    "sucesso": sucesso,
+                    "mensagem": mensagens[-1] if mensagens else "",
+                })
+
+        duracao = time.perf_counter() - inicio
+        resumo["duracao"] = duracao
+        resumo["operacoes_por_segundo"] = resumo["total"] / duracao if duracao else 0.0
+        resumo["resultados"] = resultados
+        return resumo
+
+    def _executar_comando(self, opcao, argumentos, avisar):
+        if opcao in ("d", "s"):
+            numero, valor = int(argumentos[0]), float(argumentos[1])
+            if opcao == "d":
+                return self.depositar(numero, valor, avisar)
+            return self.sacar(numero, valor, avisar)
+
+        if opcao == "u":
+            cpf, nome, data_nascimento, endereco = argumentos
+            return self.criar_usuario(nome, cpf, data_nascimento, endereco, avisar) is not None
+
+        if opcao == "c":
+            return self.criar_conta_para_usuario(argumentos[0], avisar) is not None
+
+        avisar("Operação inválida.")
+        return False
+
     def listar_usuarios(self):
         for cpf, usuario in self._usuarios.items():
             print(f"CPF: {cpf} | Nome: {usuario.nome} | Data de Nascimento: {usuario.data_nascimento} | Endereço: {usuario.endereco}")
@@ -235,7 +454,7 @@ class Banco:
 
             if opcao == "d":
                 conta = int(input("Informe o número da conta para depósito: "))
-                conta_encontrada = next((c for c in self._contas if c.numero == conta), None)
+                conta_encontrada = self.buscar_conta(conta)
                 if not conta_encontrada:
                     print("Conta não encontrada.")
                     continue
@@ -245,7 +464,7 @@ class Banco:
 
             elif opcao == "s":
                 conta = int(input("Informe o número da conta para saque: "))
-                conta_encontrada = next((c for c in self._contas if c.numero == conta), None)
+                conta_encontrada = self.buscar_conta(conta)
                 if not conta_encontrada:
                     print("Conta não encontrada.")
                     continue
@@ -255,7 +474,7 @@ class Banco:
 
             elif opcao == "e":
                 conta = int(input("Informe o número da conta para extrato: "))
-                conta_encontrada = next((c for c in self._contas if c.numero == conta), None)
+                conta_encontrada = self.buscar_conta(conta)
                 if not conta_encontrada:
                     print("Conta não encontrada.")
                     continue
@@ -292,9 +511,116 @@ class Banco:
                 print("Operação inválida, por favor selecione novamente a operação desejada.")
 
 
+class BancoAssincrono:
+    # fachada para asyncio: as operações rodam em threads sobre um Banco concorrente,
+    # sem bloquear o event loop
+    def __init__(self, banco=None):
+        self._banco = banco or Banco(concorrente=True)
+        if not self._banco.concorrente:
+            raise ValueError("BancoAssincrono exige um Banco criado com concorrente=True.")
+
+    @property
+    def banco(self):
+        return self._banco
+
+    async def criar_usuario(self, nome, cpf, data_nascimento, endereco, avisar=print):
+        return await asyncio.to_thread(self._banco.criar_usuario, nome, cpf, data_nascimento, endereco, avisar)
+
+    async def criar_conta_para_usuario(self, cpf, avisar=print):
+        return await asyncio.to_thread(self._banco.criar_conta_para_usuario, cpf, avisar)
+
+    async def depositar(self, numero, valor, avisar=print):
+        return await asyncio.to_thread(self._banco.depositar, numero, valor, avisar)
+
+    async def sacar(self, numero, valor, avisar=print):
+        return await asyncio.to_thread(self._banco.sacar, numero, valor, avisar)
+
+    async def executar_lote(self, linhas, guardar_resultados=True):
+        return await asyncio.to_thread(self._banco.executar_lote, linhas, guardar_resultados)
+
+
+def exibir_resumo_lote(resumo):
+    print("\n============ RESUMO DO LOTE ============")
+    for resultado in resumo["resultados"]:
+        if not resultado["sucesso"]:
+            print(f"Linha {resultado['linha']} ({resultado['operacao']}): {resultado['mensagem']}")
+    for opcao, contagem in sorted(resumo["por_operacao"].items()):
+        print(f"[{opcao}] sucesso: {contagem['sucesso']} | falha: {contagem['falha']}")
+    print(f"Total: {resumo['total']} | Sucesso: {resumo['sucesso']} | Falha: {resumo['falha']}")
+    print(f"Duração: {resumo['duracao']:.3f}s ({resumo['operacoes_por_segundo']:.0f} op/s)")
+    print("=========================================")
+
+
+def _criar_objetos(classe_usuario, classe_conta, quantidade):
+    objetos = []
+    for i in range(quantidade):
+        usuario = classe_usuario(f"Cliente {i}", str(i), "01/01/1990", "Rua A, 1")
+        conta = classe_conta.criar_conta(usuario, i + 1)
+        usuario.adicionar_conta(conta)
+        objetos.append(usuario)
+    return objetos
+
+
+def benchmark_memoria(quantidade):
+    variantes = [
+        ("normal", PessoaFisica, ContaCorrente),
+        ("compacto", PessoaFisicaCompacta, ContaCorrenteCompacta),
+    ]
+    print(f"\n===== BENCHMARK: {quantidade} clientes com uma conta cada =====")
+    for nome, classe_usuario, classe_conta in variantes:
+        tracemalloc.start()
+        objetos = _criar_objetos(classe_usuario, classe_conta, quantidade)
+        memoria, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        usuario = objetos[0]
+        conta = usuario.contas[0]
+        leitura = min(timeit.repeat(lambda: (conta.saldo, usuario.nome), number=1_000_000, repeat=3))
+        escrita = min(timeit.repeat("conta._saldo = 1", globals={"conta": conta}, number=1_000_000, repeat=3))
+        del objetos
+
+        print(
+            f"{nome:>8}: {memoria / 1024 / 1024:8.1f} MiB ({memoria / quantidade:6.0f} B/cliente) | "
+            f"leitura saldo+nome: {leitura * 1000:5.1f} ns | escrita _saldo: {escrita * 1000:5.1f} ns"
+        )
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Sistema bancário")
+    parser.add_argument(
+        "--lote",
+        metavar="ARQUIVO",
+        help="executa as operações do arquivo (ou '-' para stdin) sem o menu interativo",
+    )
+    parser.add_argument(
+        "--sem-detalhes",
+        action="store_true",
+        help="no modo lote, não guarda o resultado de cada linha (apenas o resumo)",
+    )
+    parser.add_argument(
+        "--benchmark-memoria",
+        metavar="N",
+        type=int,
+        help="compara memória e acesso a atributos das classes normais e compactas",
+    )
+    args = parser.parse_args()
+
+    if args.benchmark_memoria:
+        benchmark_memoria(args.benchmark_memoria)
+        return
+
     banco = Banco()
-    banco.run()
+    if args.lote is None:
+        banco.run()
+        return
+
+    guardar = not args.sem_detalhes
+    if args.lote == "-":
+        resumo = banco.executar_lote(sys.stdin, guardar_resultados=guardar)
+    else:
+        with open(args.lote, newline="", encoding="utf-8") as arquivo:
+            resumo = banco.executar_lote(arquivo, guardar_resultados=guardar)
+    exibir_resumo_lote(resumo)
 
 if __name__ == "__main__":
     main()
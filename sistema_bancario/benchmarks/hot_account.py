@@ -0,0 +1,101 @@
+"""
+Hot-account deposit benchmark.
+
+Runs concurrent deposits against a single account, once per bucket count,
+and checks that no money is lost. Row-level locking databases (Postgres)
+serialize deposits on the account row, so throughput should grow with the
+number of buckets; SQLite locks the whole database on write, so there the
+numbers stay flat and the run only validates correctness.
+
+Run from the sistema_bancario directory:
+
+    python -m benchmarks.hot_account --deposits 2000 --concurrency 32 --buckets 0 4 16
+    python -m benchmarks.hot_account --database-url postgresql+asyncpg://...
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import delete, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from models.database import Account, BalanceBucket, Base, Transaction, TransactionType, User
+from services.balances import effective_balance, set_balance_buckets
+from services.transactions import apply_transaction
+
+
+async def prepare(session_factory) -> int:
+    async with session_factory() as db:
+        user = User(username="hot", email="hot@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        account = Account(user_id=user.id, account_number="HOT0000001", balance=0.0)
+        db.add(account)
+        await db.commit()
+        return account.id
+
+
+async def run_deposits(session_factory, account_id: int, buckets: int, deposits: int, concurrency: int) -> float:
+    queue = asyncio.Queue()
+    for _ in range(deposits):
+        queue.put_nowait(1.0)
+
+    async def worker():
+        async with session_factory() as db:
+            while not queue.empty():
+                amount = queue.get_nowait()
+                await apply_transaction(db, account_id, TransactionType.DEPOSIT, amount, buckets=buckets)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - start
+
+
+async def run(database_url: str, deposits: int, concurrency: int, bucket_counts: list[int]) -> None:
+    engine = create_async_engine(database_url, pool_size=concurrency, max_overflow=0)
+    if engine.dialect.name == "sqlite":
+        async with engine.connect() as conn:
+            await conn.execute(text("PRAGMA journal_mode=WAL"))
+    session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    account_id = await prepare(session_factory)
+
+    print(f"{deposits} deposits of 1.0 to one account, {concurrency} concurrent sessions ({engine.dialect.name}):")
+    for buckets in bucket_counts:
+        async with session_factory() as db:
+            await db.execute(delete(Transaction).where(Transaction.account_id == account_id))
+            await db.execute(delete(BalanceBucket).where(BalanceBucket.account_id == account_id))
+            await db.execute(text("UPDATE accounts SET balance = 0 WHERE id = :id"), {"id": account_id})
+            await db.commit()
+            await set_balance_buckets(db, account_id, buckets)
+
+        elapsed = await run_deposits(session_factory, account_id, buckets, deposits, concurrency)
+
+        async with session_factory() as db:
+            balance = await effective_balance(db, account_id)
+        status = "ok" if balance == deposits else f"MISMATCH (balance {balance})"
+        print(f"  buckets={buckets:<3} {deposits / elapsed:9.0f} deposits/s  {status}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--deposits", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--buckets", type=int, nargs="+", default=[0, 4, 16])
+    args = parser.parse_args()
+
+    if args.database_url:
+        asyncio.run(run(args.database_url, args.deposits, args.concurrency, args.buckets))
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite+aiosqlite:///{os.path.join(tmp, 'hot.db')}"
+        asyncio.run(run(url, args.deposits, args.concurrency, args.buckets))
+
+
+if __name__ == "__main__":
+    main()
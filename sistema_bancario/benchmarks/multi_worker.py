@@ -0,0 +1,196 @@
+"""
+Multi-worker read scaling benchmark.
+
+Starts `uvicorn main:app --workers N` on a temporary SQLite database for each
+worker count, hammers GET /accounts/{id} from several client processes over
+keep-alive connections and reports requests per second and the scaling
+relative to the first worker count. With the per-worker caches enabled reads
+are served without touching the database, so throughput should grow nearly
+linearly with workers (up to the number of cores left to the clients).
+
+After each load run a deposit is made and the benchmark measures how long
+it takes until every connection (spread over all workers) reads the new
+balance, i.e. the cross-worker invalidation delay of the change_log feed.
+
+Run from the sistema_bancario directory:
+
+    python -m benchmarks.multi_worker --workers 1 2 4 --seconds 10
+    python -m benchmarks.multi_worker --workers 1 4 --no-cache
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+HOST = "127.0.0.1"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def call(port: int, method: str, path: str, body: dict = None, token: str = None) -> dict:
+    request = urllib.request.Request(f"http://{HOST}:{port}{path}", method=method)
+    request.add_header("Content-Type", "application/json")
+    if token:
+        request.add_header("Authorization", f"Bearer {token}")
+    data = json.dumps(body).encode() if body is not None else None
+    with urllib.request.urlopen(request, data) as response:
+        return json.loads(response.read())
+
+
+def start_server(workers: int, port: int, database: str, cache: bool) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        BANKING_DATABASE_URL=f"sqlite+aiosqlite:///{database}",
+        BANKING_DATABASE_ECHO="false",
+        BANKING_CACHE_ENABLED=str(cache).lower(),
+    )
+    # Migrate once up front, as a multi-worker deployment does
+    subprocess.run([sys.executable, "-m", "models.migrations", "upgrade"], cwd=APP_DIR, env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", HOST, "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=APP_DIR, env=env
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            call(port, "GET", "/")
+            return server
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise RuntimeError("server did not start")
+
+
+def prepare(port: int) -> tuple[str, int]:
+    call(port, "POST", "/auth/register", {"username": "bench", "email": "bench@example.com", "password": "secret1"})
+    token = call(port, "POST", "/auth/login", {"username": "bench", "password": "secret1"})["access_token"]
+    account_id = call(port, "POST", "/accounts", {"account_number": "BENCH00001"}, token)["id"]
+    call(port, "POST", "/transactions",
+         {"account_id": account_id, "transaction_type": "deposit", "amount": 100.0}, token)
+    return token, account_id
+
+
+class Connection:
+    """Minimal HTTP/1.1 keep-alive client (GET only), so the benchmark needs no extra packages"""
+
+    def __init__(self, port: int, token: str):
+        self.port = port
+        self.headers = f"Host: {HOST}\r\nAuthorization: Bearer {token}\r\n"
+
+    async def open(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(HOST, self.port)
+
+    async def get(self, path: str) -> tuple[int, bytes]:
+        self.writer.write(f"GET {path} HTTP/1.1\r\n{self.headers}\r\n".encode())
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while (line := await self.reader.readline()) != b"\r\n":
+            name, _, value = line.partition(b":")
+            if name.lower() == b"content-length":
+                length = int(value)
+        return status, await self.reader.readexactly(length)
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+async def _load(port: int, token: str, path: str, connections: int, seconds: float) -> tuple[int, int]:
+    deadline = time.monotonic() + seconds
+    counts = [0, 0]
+
+    async def client():
+        connection = Connection(port, token)
+        await connection.open()
+        try:
+            while time.monotonic() < deadline:
+                status, _ = await connection.get(path)
+                counts[0 if status == 200 else 1] += 1
+        finally:
+            connection.close()
+
+    await asyncio.gather(*(client() for _ in range(connections)))
+    return counts[0], counts[1]
+
+
+def load_process(args: tuple) -> tuple[int, int]:
+    return asyncio.run(_load(*args))
+
+
+async def _propagation(port: int, token: str, path: str, connections: int, expected: float) -> float:
+    """Seconds until every connection reads the expected balance"""
+    started = time.monotonic()
+
+    async def client():
+        connection = Connection(port, token)
+        await connection.open()
+        try:
+            while json.loads((await connection.get(path))[1])["balance"] != expected:
+                await asyncio.sleep(0.005)
+        finally:
+            connection.close()
+
+    await asyncio.wait_for(asyncio.gather(*(client() for _ in range(connections))), timeout=60)
+    return time.monotonic() - started
+
+
+def run(workers: int, seconds: float, processes: int, connections: int, cache: bool) -> float:
+    with tempfile.TemporaryDirectory() as directory:
+        port = free_port()
+        server = start_server(workers, port, os.path.join(directory, "bench.db"), cache)
+        try:
+            token, account_id = prepare(port)
+            path = f"/accounts/{account_id}"
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.map(load_process, [(port, token, path, connections, seconds)] * processes)
+            ok = sum(r[0] for r in results)
+            errors = sum(r[1] for r in results)
+            rps = ok / seconds
+
+            deposit = call(port, "POST", "/transactions",
+                           {"account_id": account_id, "transaction_type": "deposit", "amount": 1.0}, token)
+            expected = call(port, "GET", path, token=token)["balance"]
+            delay = asyncio.run(_propagation(port, token, path, processes * connections, expected))
+            print(f"workers={workers:<3} {rps:>10.0f} req/s  errors={errors:<6} "
+                  f"all workers saw deposit {deposit['id']} after {delay * 1000:.0f} ms")
+            return rps
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--connections", type=int, default=16, help="keep-alive connections per client process")
+    parser.add_argument("--no-cache", action="store_true", help="run the workers with the caches disabled")
+    args = parser.parse_args()
+
+    print(f"GET /accounts/{{id}}, caches {'disabled' if args.no_cache else 'enabled'}, "
+          f"{args.client_processes}x{args.connections} connections, {os.cpu_count()} cores")
+    baseline = None
+    for workers in args.workers:
+        rps = run(workers, args.seconds, args.client_processes, args.connections, not args.no_cache)
+        # Throughput per worker of the first run
+        baseline = baseline or rps / workers
+        print(f"{'':<12}scaling x{rps / baseline:.2f} (ideal x{workers})")
+
+
+if __name__ == "__main__":
+    main()
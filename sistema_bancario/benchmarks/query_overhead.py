@@ -0,0 +1,140 @@
+"""
+SQLAlchemy overhead of the hot queries.
+
+For each hot query measures, in microseconds per call on an in-memory
+SQLite database (so the SQLAlchemy layer dominates):
+
+* build:     constructing the select, as the handlers used to on every request;
+* compile:   compiling it to SQL (what the compiled cache saves);
+* rebuilt:   build + execute, compiled cache on (the previous per-request cost);
+* uncached:  build + execute with the compiled cache off;
+* prebuilt:  executing the module-level statement with parameters (models.queries,
+             services.archive.LIVE_STATEMENTS);
+* lambda:    executing the equivalent lambda_stmt, for comparison.
+
+Run from the sistema_bancario directory:
+
+    python -m benchmarks.query_overhead --iterations 20000
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, lambda_stmt, select
+from sqlalchemy.orm import Session
+
+from models.database import Account, Base, Transaction, TransactionType, User
+from models.queries import ACCOUNT_BY_ID, USER_BY_USERNAME
+from services.archive import LIVE_STATEMENTS
+from services.serialization import TRANSACTION_COLUMNS
+
+USERS = 1000
+TRANSACTIONS_PER_ACCOUNT = 10
+
+
+def prepare(engine) -> None:
+    Base.metadata.create_all(engine)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "username": f"user{i}", "email": f"user{i}@example.com", "hashed_password": "x"}
+            for i in range(1, USERS + 1)
+        ])
+        conn.execute(insert(Account), [
+            {"id": i, "user_id": i, "account_number": f"ACC{i:07d}", "balance": 100.0}
+            for i in range(1, USERS + 1)
+        ])
+        conn.execute(insert(Transaction), [
+            {
+                "account_id": i,
+                "transaction_type": TransactionType.DEPOSIT,
+                "amount": 10.0,
+                "created_at": now - timedelta(minutes=n),
+            }
+            for i in range(1, USERS + 1) for n in range(TRANSACTIONS_PER_ACCOUNT)
+        ])
+
+
+def timed(func, iterations: int) -> float:
+    """Microseconds per call"""
+    started = time.perf_counter()
+    for i in range(iterations):
+        func(i % USERS + 1)
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    prepare(engine)
+    uncached = engine.execution_options(compiled_cache=None)
+    session = Session(engine)
+    uncached_session = Session(uncached)
+    conn = engine.connect()
+    uncached_conn = uncached.connect()
+
+    def ledger(account_id):
+        return (
+            select(*TRANSACTION_COLUMNS)
+            .where(Transaction.account_id == account_id)
+            .order_by(Transaction.created_at.desc())
+        )
+
+    def ledger_lambda(account_id):
+        stmt = lambda_stmt(lambda: select(*TRANSACTION_COLUMNS).where(Transaction.account_id == account_id))
+        stmt += lambda s: s.order_by(Transaction.created_at.desc())
+        return stmt
+
+    def user_lambda(username):
+        return lambda_stmt(lambda: select(User).where(User.username == username))
+
+    queries = {
+        "user by username": {
+            "build": lambda i: select(User).where(User.username == f"user{i}"),
+            "rebuilt": lambda i: session.execute(select(User).where(User.username == f"user{i}")).scalar_one(),
+            "uncached": lambda i: uncached_session.execute(select(User).where(User.username == f"user{i}")).scalar_one(),
+            "prebuilt": lambda i: session.execute(USER_BY_USERNAME, {"username": f"user{i}"}).scalar_one(),
+            "lambda": lambda i: session.execute(user_lambda(f"user{i}")).scalar_one(),
+        },
+        "account by id": {
+            "build": lambda i: select(Account).where(Account.id == i),
+            "rebuilt": lambda i: session.execute(select(Account).where(Account.id == i)).scalar_one(),
+            "uncached": lambda i: uncached_session.execute(select(Account).where(Account.id == i)).scalar_one(),
+            "prebuilt": lambda i: session.execute(ACCOUNT_BY_ID, {"account_id": i}).scalar_one(),
+            "lambda": lambda i: session.execute(lambda_stmt(lambda: select(Account).where(Account.id == i))).scalar_one(),
+        },
+        "ordered transactions": {
+            "build": ledger,
+            "rebuilt": lambda i: conn.execute(ledger(i)).all(),
+            "uncached": lambda i: uncached_conn.execute(ledger(i)).all(),
+            "prebuilt": lambda i: conn.execute(LIVE_STATEMENTS[False, False], {"account_id": i}).all(),
+            "lambda": lambda i: conn.execute(ledger_lambda(i)).all(),
+        },
+    }
+
+    # The variants must return the same rows
+    prebuilt = LIVE_STATEMENTS[False, False]
+    assert conn.execute(ledger(7)).all() == conn.execute(prebuilt, {"account_id": 7}).all() \
+        == conn.execute(ledger_lambda(7)).all() != conn.execute(ledger_lambda(8)).all()
+
+    print(f"microseconds per call, {args.iterations} iterations")
+    print(f"{'query':<22}{'build':>9}{'compile':>9}{'rebuilt':>9}{'uncached':>10}{'prebuilt':>10}{'lambda':>9}")
+    for name, variants in queries.items():
+        build = variants["build"]
+        results = {variant: timed(func, args.iterations) for variant, func in variants.items()}
+        results["compile"] = timed(lambda i: build(i).compile(dialect=engine.dialect), args.iterations // 4)
+        # Identity map would turn repeated ORM loads into no-ops otherwise
+        session.expunge_all()
+        uncached_session.expunge_all()
+        cells = "".join(
+            f"{results[v]:>{w}.1f}" if v in results else f"{'-':>{w}}"
+            for v, w in (("build", 9), ("compile", 9), ("rebuilt", 9), ("uncached", 10), ("prebuilt", 10), ("lambda", 9))
+        )
+        print(f"{name:<22}{cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Application cold-start profile.
+
+Each run starts a fresh interpreter, so every number is a cold start:
+
+* `-X importtime` of `import main`: total, slowest modules (self time) and
+  heaviest top-level packages (cumulative time);
+* lifespan phases as recorded in `app.state.startup_timings`, both against
+  a fresh database and against an up-to-date one (the common restart case).
+
+With --max-ms the script exits with status 1 when the median cold start on an
+up-to-date database (imports + lifespan) exceeds the budget, so it can gate CI.
+
+Run from the sistema_bancario directory:
+
+    python -m benchmarks.startup_profile --runs 5 --max-ms 1500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+LIFESPAN_PROBE = """
+import asyncio, json, time
+started = time.perf_counter()
+import main
+imported = (time.perf_counter() - started) * 1000
+
+async def run():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+asyncio.run(run())
+total = (time.perf_counter() - started) * 1000
+print(json.dumps({"python_import": imported, "total": total, **main.app.state.startup_timings}))
+"""
+
+
+def _run(args: list[str], env: dict) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """Parse `-X importtime` output into (module, self_us, cumulative_us)"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((name.strip(), int(self_us), int(cumulative_us)))
+    return entries
+
+
+def importtime_report(runs: int, env: dict, top: int) -> None:
+    totals = []
+    self_times = defaultdict(list)
+    package_times = defaultdict(list)
+    for _ in range(runs):
+        entries = parse_importtime(_run(["-X", "importtime", "-c", "import main"], env).stderr)
+        totals.append(next(cumulative for name, _, cumulative in entries if name == "main"))
+        for name, self_us, cumulative_us in entries:
+            self_times[name].append(self_us)
+            if "." not in name:
+                package_times[name].append(cumulative_us)
+
+    print(f"import main: median {statistics.median(totals) / 1000:.1f} ms over {runs} runs")
+    print("\nSlowest modules (self time, median ms):")
+    for name, times in sorted(self_times.items(), key=lambda item: -statistics.median(item[1]))[:top]:
+        print(f"  {statistics.median(times) / 1000:8.1f}  {name}")
+    print("\nHeaviest top-level imports (cumulative, median ms):")
+    for name, times in sorted(package_times.items(), key=lambda item: -statistics.median(item[1]))[:top]:
+        print(f"  {statistics.median(times) / 1000:8.1f}  {name}")
+
+
+def lifespan_report(runs: int, env: dict) -> float:
+    """Print lifespan phases and return the median cold start on an up-to-date database"""
+    results = {"fresh database": [], "up-to-date database": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(runs):
+            database = Path(tmp) / "startup.db"
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{database}{suffix}").unlink(missing_ok=True)
+            run_env = {**env, "BANKING_DATABASE_URL": f"sqlite+aiosqlite:///{database}"}
+            results["fresh database"].append(json.loads(_run(["-c", LIFESPAN_PROBE], run_env).stdout))
+            results["up-to-date database"].append(json.loads(_run(["-c", LIFESPAN_PROBE], run_env).stdout))
+
+    for label, samples in results.items():
+        print(f"\nCold start, {label} (median ms over {runs} runs):")
+        for phase in samples[0]:
+            print(f"  {phase:<14} {statistics.median(s[phase] for s in samples):8.1f}")
+    return statistics.median(s["total"] for s in results["up-to-date database"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-ms", type=float, help="fail when the median cold start exceeds this budget")
+    args = parser.parse_args()
+
+    env = {**os.environ, "BANKING_DATABASE_ECHO": "false"}
+    importtime_report(args.runs, env, args.top)
+    cold_start = lifespan_report(args.runs, env)
+
+    if args.max_ms is not None:
+        status = "OK" if cold_start <= args.max_ms else "FAIL"
+        print(f"\n{status}: cold start {cold_start:.1f} ms (budget {args.max_ms:.1f} ms)")
+        if status == "FAIL":
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
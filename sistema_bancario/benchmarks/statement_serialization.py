@@ -0,0 +1,118 @@
+"""
+Statement serialization benchmark.
+
+Compares the previous statement path (ORM entities + TransactionResponse
+validation + response_model serialization) with the current one (Core
+column rows + orjson) on a single account with many transactions.
+
+Run from the sistema_bancario directory:
+
+    python -m benchmarks.statement_serialization --rows 100000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from models.database import Account, Base, Transaction, TransactionType, User
+from models.schemas import AccountResponse, StatementResponse, TransactionResponse
+from services.serialization import TRANSACTION_COLUMNS, FastJSONResponse, fetch_account_row, fetch_rows
+
+
+async def seed(session_factory, rows: int) -> int:
+    """Create one account with `rows` transactions and return its id"""
+    async with session_factory() as db:
+        user = User(username="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        account = Account(user_id=user.id, account_number="0000000001", balance=0.0)
+        db.add(account)
+        await db.flush()
+        start = datetime(2020, 1, 1)
+        await db.execute(insert(Transaction), [
+            {
+                "account_id": account.id,
+                "transaction_type": TransactionType.DEPOSIT if i % 2 else TransactionType.WITHDRAWAL,
+                "amount": float(i % 500 + 1),
+                "description": None,
+                "created_at": start + timedelta(minutes=i),
+            }
+            for i in range(rows)
+        ])
+        await db.commit()
+        return account.id
+
+
+async def orm_statement(db: AsyncSession, account_id: int) -> bytes:
+    """Previous path: entities, per-row model_validate, then response_model dump"""
+    account = (await db.execute(select(Account).where(Account.id == account_id))).scalar_one()
+    result = await db.execute(
+        select(Transaction)
+        .where(Transaction.account_id == account_id)
+        .order_by(Transaction.created_at.desc())
+    )
+    transactions = result.scalars().all()
+    statement = StatementResponse(
+        account=AccountResponse.model_validate(account),
+        transactions=[TransactionResponse.model_validate(t) for t in transactions],
+        total_transactions=len(transactions)
+    )
+    return TypeAdapter(StatementResponse).dump_json(statement)
+
+
+async def core_statement(db: AsyncSession, account_id: int) -> bytes:
+    """Current path: Core rows rendered with orjson"""
+    account = await fetch_account_row(db, account_id)
+    account.pop("version")
+    transactions = await fetch_rows(
+        db,
+        select(*TRANSACTION_COLUMNS)
+        .where(Transaction.account_id == account_id)
+        .order_by(Transaction.created_at.desc())
+    )
+    return FastJSONResponse({
+        "account": account,
+        "transactions": transactions,
+        "total_transactions": len(transactions)
+    }).body
+
+
+async def run(rows: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        session_factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        account_id = await seed(session_factory, rows)
+
+        print(f"Statement of {rows} transactions, best of {repeat}:")
+        timings = {}
+        for name, build in (("orm + pydantic", orm_statement), ("core + orjson", core_statement)):
+            best = float("inf")
+            for _ in range(repeat):
+                async with session_factory() as db:
+                    start = time.perf_counter()
+                    body = await build(db, account_id)
+                    best = min(best, time.perf_counter() - start)
+            timings[name] = best
+            print(f"  {name:<16} {best * 1000:9.1f} ms  ({len(body) / 1024 / 1024:.1f} MiB)")
+        print(f"  speedup: {timings['orm + pydantic'] / timings['core + orjson']:.1f}x")
+        await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+from typing import Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """Application settings, overridable through BANKING_* environment variables or .env"""
+    model_config = SettingsConfigDict(env_prefix="BANKING_", env_file=".env", extra="ignore")
+
+    # Database
+    database_url: str = "sqlite+aiosqlite:///./banking.db"
+    # Reader engine; defaults to a read-only connection to the SQLite file
+    read_database_url: Optional[str] = None
+    database_echo: bool = True
+    # After a client commits, its reads go to the writer for this many seconds
+    read_your_writes_seconds: float = 5.0
+
+    # Auth: bcrypt cost of new hashes (calibrate with `python -m services.auth calibrate`);
+    # stored hashes with another cost are rehashed on login
+    bcrypt_rounds: int = 12
+    # Users allowed on the /admin endpoints
+    admin_usernames: list[str] = []
+
+    # Background jobs
+    job_workers: int = 2
+    job_poll_seconds: float = 2.0
+    # Jobs left running longer than this (e.g. by a crashed worker) are retried
+    job_stale_seconds: float = 600.0
+    job_artifact_dir: str = "./artifacts"
+
+    # Rate limits (token buckets, per process) and concurrency caps
+    login_rate_per_second: float = 0.5
+    login_burst: int = 10
+    # Logins verifying a bcrypt hash at once (each holds a CPU in a worker thread)
+    login_concurrency: int = 4
+    register_rate_per_second: float = 0.1
+    register_burst: int = 5
+    transaction_rate_per_second: float = 10.0
+    transaction_burst: int = 20
+    transaction_concurrency: int = 32
+    statement_concurrency: int = 8
+
+    # Event-loop monitor (lag heartbeat, stack samples of blocking sections) and profiler
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_seconds: float = 0.1
+    slow_callback_ms: float = 100.0
+    profile_interval_ms: float = 5.0
+    profile_dir: str = "./profiles"
+
+    # Per-worker caches, invalidated across workers through the change_log table
+    cache_enabled: bool = True
+    cache_ttl_seconds: float = 30.0
+    cache_max_entries: int = 10_000
+    change_poll_seconds: float = 0.5
+    change_log_retention_seconds: float = 3600.0
+
+
+settings = Settings()
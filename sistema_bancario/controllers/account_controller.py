@@ -1,13 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import bindparam, select, func
 
-from models.database import Account, User, get_db
-from models.schemas import AccountCreate, AccountResponse
+from models.database import Account, User, get_db, get_read_db
+from models.queries import ACCOUNT_BY_NUMBER, ACCOUNT_IDS_BY_USER
+from models.schemas import AccountCreate, AccountResponse, AnalyticsResponse, Granularity
+from services.analytics import activity
 from services.auth import get_current_user
+from services.balances import EFFECTIVE_VERSION
+from services.etag import etag_matches, make_etag, not_modified
+from services.cache import cached_account_row
+from services.serialization import USER_ACCOUNT_ROWS, FastJSONResponse, fetch_rows
 
 router = APIRouter(prefix="/accounts", tags=["Accounts"])
 
+# ETag components of a user's account list, built once
+USER_ACCOUNTS_VERSION = (
+    select(func.count(Account.id), func.coalesce(func.sum(EFFECTIVE_VERSION), 0), func.coalesce(func.max(Account.id), 0))
+    .where(Account.user_id == bindparam("user_id"))
+)
+
 
 @router.post("", response_model=AccountResponse, status_code=status.HTTP_201_CREATED)
 async def create_account(
@@ -23,7 +37,7 @@ async def create_account(
     The account will be linked to the authenticated user and start with a balance of 0.0.
     """
     # Check if account number already exists
-    result = await db.execute(select(Account).where(Account.account_number == account_data.account_number))
+    result = await db.execute(ACCOUNT_BY_NUMBER, {"account_number": account_data.account_number})
     existing_account = result.scalar_one_or_none()
     if existing_account:
         raise HTTPException(
@@ -44,11 +58,84 @@ async def create_account(
     return new_account
 
 
+# Declared before /{account_id} so "analytics" is not parsed as an account id
+@router.get("/analytics", response_model=AnalyticsResponse)
+async def get_user_analytics(
+    granularity: Granularity = Granularity.MONTH,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    running_balance: bool = False,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get deposit and withdrawal totals across all accounts of the authenticated user.
+    
+    - **granularity**: `day` or `month` (default)
+    - **from**: Optional start date/time (inclusive)
+    - **to**: Optional end date/time (exclusive)
+    - **running_balance**: Include the combined balance at the end of each period
+    """
+    result = await db.execute(ACCOUNT_IDS_BY_USER, {"user_id": current_user.id})
+    account_ids = result.scalars().all()
+    buckets = await activity(db, account_ids, granularity, start, end, running_balance)
+    return FastJSONResponse({"account_ids": account_ids, "granularity": granularity.value, "buckets": buckets})
+
+
+@router.get("/{account_id}/analytics", response_model=AnalyticsResponse)
+async def get_account_analytics(
+    account_id: int,
+    granularity: Granularity = Granularity.MONTH,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    running_balance: bool = False,
+    if_none_match: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get per-day or per-month deposit and withdrawal totals of an account.
+    
+    - **account_id**: The ID of the account
+    - **granularity**: `day` or `month` (default)
+    - **from**: Optional start date/time (inclusive)
+    - **to**: Optional end date/time (exclusive)
+    - **running_balance**: Include the account balance at the end of each period
+    
+    Totals are aggregated in the database; only the account owner can access them.
+    Supports `ETag` / `If-None-Match` like the account endpoint.
+    """
+    account = await cached_account_row(db, account_id)
+    
+    if not account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found"
+        )
+    
+    if account["user_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this account"
+        )
+    
+    etag = make_etag("analytics", account_id, account["version"], granularity.value, start, end, running_balance)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    buckets = await activity(db, [account_id], granularity, start, end, running_balance)
+    return FastJSONResponse(
+        {"account_ids": [account_id], "granularity": granularity.value, "buckets": buckets},
+        headers={"ETag": etag}
+    )
+
+
 @router.get("/{account_id}", response_model=AccountResponse)
 async def get_account(
     account_id: int,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get account details by account ID.
@@ -56,9 +143,10 @@ async def get_account(
     - **account_id**: The ID of the account to retrieve
     
     Only the account owner can access their account information.
+    The response carries an `ETag`; send it back in `If-None-Match` to get
+    a `304 Not Modified` while the account is unchanged.
     """
-    result = await db.execute(select(Account).where(Account.id == account_id))
-    account = result.scalar_one_or_none()
+    account = await cached_account_row(db, account_id)
     
     if not account:
         raise HTTPException(
@@ -67,26 +155,37 @@ async def get_account(
         )
     
     # Verify that the account belongs to the current user
-    if account.user_id != current_user.id:
+    if account["user_id"] != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to access this account"
         )
     
-    return account
+    etag = make_etag(account_id, account.pop("version"))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    return FastJSONResponse(account, headers={"ETag": etag})
 
 
 @router.get("", response_model=list[AccountResponse])
 async def get_user_accounts(
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all accounts belonging to the authenticated user.
     
     Returns a list of all accounts associated with the current user.
+    Supports `ETag` / `If-None-Match` like the single account endpoint.
     """
-    result = await db.execute(select(Account).where(Account.user_id == current_user.id))
-    accounts = result.scalars().all()
-    return list(accounts)
+    # The list changes when an account is created or any balance changes
+    result = await db.execute(USER_ACCOUNTS_VERSION, {"user_id": current_user.id})
+    etag = make_etag("accounts", current_user.id, *result.one())
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    accounts = await fetch_rows(db, USER_ACCOUNT_ROWS, {"user_id": current_user.id})
+    return FastJSONResponse(accounts, headers={"ETag": etag})
 
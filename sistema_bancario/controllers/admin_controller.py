@@ -0,0 +1,75 @@
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Depends, Query
+
+from models.schemas import BcryptMetricsResponse, LoopStatsResponse, ProfilerStatus
+from services import auth
+from services.auth import get_admin_user
+from services.profiling import loop_monitor, profiler
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(get_admin_user)])
+
+
+@router.get("/metrics/bcrypt", response_model=BcryptMetricsResponse)
+async def get_bcrypt_metrics():
+    """
+    Password verification latency per bcrypt cost in this worker process.
+    
+    Use it while changing `BANKING_BCRYPT_ROUNDS`: logins with hashes of
+    another cost are rehashed in the background, so the old cost fades out.
+    """
+    return {
+        "configured_rounds": auth.BCRYPT_ROUNDS,
+        "rehashed_passwords": auth.rehashed_passwords,
+        "verify_latency": [
+            {
+                "rounds": rounds,
+                "count": stats.count,
+                "mean_ms": stats.total_ms / stats.count,
+                "max_ms": stats.max_ms,
+            }
+            for rounds, stats in auth.verify_latency_snapshot()
+        ],
+    }
+
+
+@router.get("/loop", response_model=LoopStatsResponse)
+async def get_loop_stats():
+    """
+    Event-loop lag of this worker and its recent blocking sections.
+    
+    Each slow section lists the stacks sampled while the loop was blocked
+    longer than `BANKING_SLOW_CALLBACK_MS`.
+    """
+    return loop_monitor.stats()
+
+
+def profiler_status(path: Optional[str] = None) -> dict:
+    return {
+        "running": profiler.running,
+        "interval_ms": profiler.interval_ms,
+        "samples": profiler.sample_count,
+        "path": path,
+    }
+
+
+@router.post("/profiler/start", response_model=ProfilerStatus)
+async def start_profiler(interval_ms: Optional[float] = Query(None, gt=0)):
+    """
+    Start sampling the event-loop thread of this worker.
+    
+    - **interval_ms**: Sampling interval (default `BANKING_PROFILE_INTERVAL_MS`)
+    """
+    profiler.start(interval_ms)
+    return profiler_status()
+
+
+@router.post("/profiler/stop", response_model=ProfilerStatus)
+async def stop_profiler():
+    """
+    Stop the profiler and write its samples as a collapsed-stack file.
+    
+    The file (under `BANKING_PROFILE_DIR`) feeds flamegraph.pl, speedscope or inferno.
+    """
+    path = await asyncio.to_thread(profiler.stop)
+    return profiler_status(path)
@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from models.database import User, get_db
+from models.database import User, get_db, get_read_db
 from models.schemas import UserCreate, UserResponse, Token, LoginRequest
 from services.auth import (
     get_password_hash,
@@ -13,11 +13,17 @@ from services.auth import (
     get_user_by_email,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
+from services.rate_limit import limit_by_ip, limit_concurrency, login_concurrency, login_limiter, register_limiter
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/register",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_by_ip(register_limiter))]
+)
 async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Register a new user.
@@ -25,6 +31,8 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     - **username**: Unique username (3-50 characters)
     - **email**: Valid email address
     - **password**: Password (6-72 characters)
+    
+    Rate limited per client address (429 with `Retry-After` when exceeded).
     """
     # Check if username already exists
     existing_user = await get_user_by_username(db, user_data.username)
@@ -62,8 +70,12 @@ async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     return new_user
 
 
-@router.post("/login", response_model=Token)
-async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_db)):
+@router.post(
+    "/login",
+    response_model=Token,
+    dependencies=[Depends(limit_by_ip(login_limiter)), Depends(limit_concurrency(login_concurrency))]
+)
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_read_db)):
     """
     Login and receive a JWT access token.
     
@@ -71,6 +83,8 @@ async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_db)):
     - **password**: Your password
     
     Returns a JWT token that should be used in the Authorization header as: Bearer <token>
+    
+    Rate limited per client address and capped in concurrency (429 with `Retry-After`).
     """
     user = await authenticate_user(db, login_data.username, login_data.password)
     if not user:
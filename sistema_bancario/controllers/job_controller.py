@@ -0,0 +1,70 @@
+import os
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database import Job, JobStatus, User, get_read_db
+from models.schemas import JobResponse
+from services.auth import get_current_user
+from services.jobs import get_job, job_response
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+async def get_owned_job(job_id: int, current_user: User, db: AsyncSession) -> Job:
+    job = await get_job(db, job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    if job.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this job"
+        )
+    return job
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job_status(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get the status of a background job.
+    
+    - **job_id**: The ID returned when the job was created
+    
+    Poll until the status is `done` (then follow `download_url`) or `failed`.
+    """
+    job = await get_owned_job(job_id, current_user, db)
+    return job_response(job)
+
+
+@router.get("/{job_id}/download")
+async def download_job_artifact(
+    job_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Download the file produced by a finished job.
+    
+    Returns 409 while the job is not finished, and 410 once a newer job for
+    the same account replaced its file (or the file was removed).
+    """
+    job = await get_owned_job(job_id, current_user, db)
+    # The file of a DONE job may be expiring concurrently, or the artifact directory wiped
+    if job.status == JobStatus.EXPIRED or (job.status == JobStatus.DONE and not os.path.exists(job.artifact_path)):
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Job result expired, request a new one"
+        )
+    if job.status != JobStatus.DONE:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Job is {job.status.value}"
+        )
+    return FileResponse(job.artifact_path, media_type="application/json", filename=f"statement-{job.account_id}.json")
@@ -1,24 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
-from models.database import Account, Transaction, User, get_db
-from models.schemas import StatementResponse, AccountResponse, TransactionResponse
+from models.database import User, get_db, get_read_db
+from models.schemas import JobResponse, StatementResponse
+from services.archive import ledger_statement
 from services.auth import get_current_user
+from services.etag import etag_matches, make_etag, not_modified
+from services.jobs import STATEMENT_JOB, enqueue_job, job_response
+from services.rate_limit import limit_concurrency, statement_concurrency
+from services.cache import cached_account_row
+from services.serialization import FastJSONResponse, fetch_account_row, fetch_rows
 
 router = APIRouter(prefix="/statements", tags=["Statements"])
 
 
-@router.get("/account/{account_id}", response_model=StatementResponse)
+@router.get(
+    "/account/{account_id}",
+    response_model=StatementResponse,
+    dependencies=[Depends(limit_concurrency(statement_concurrency))]
+)
 async def get_account_statement(
     account_id: int,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get the complete statement for an account, including all transactions.
     
     - **account_id**: The ID of the account
+    - **from**: Optional start date/time (inclusive)
+    - **to**: Optional end date/time (exclusive)
+    
+    Archived transactions are read only when the range reaches their period;
+    without a range the statement covers the whole history.
     
     Returns:
     - Account information (number, balance, etc.)
@@ -26,10 +45,10 @@ async def get_account_statement(
     - Total number of transactions
     
     Only the account owner can view their statement.
+    Supports `ETag` / `If-None-Match`: unchanged statements return `304 Not Modified`.
     """
     # Verify account exists and belongs to user
-    result = await db.execute(select(Account).where(Account.id == account_id))
-    account = result.scalar_one_or_none()
+    account = await cached_account_row(db, account_id)
     
     if not account:
         raise HTTPException(
@@ -37,23 +56,55 @@ async def get_account_statement(
             detail="Account not found"
         )
     
-    if account.user_id != current_user.id:
+    if account["user_id"] != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view statement for this account"
         )
     
-    # Get all transactions for this account
-    result = await db.execute(
-        select(Transaction)
-        .where(Transaction.account_id == account_id)
-        .order_by(Transaction.created_at.desc())
-    )
-    transactions = result.scalars().all()
-    
-    return StatementResponse(
-        account=AccountResponse.model_validate(account),
-        transactions=[TransactionResponse.model_validate(t) for t in transactions],
-        total_transactions=len(transactions)
-    )
+    etag = make_etag("statement", account_id, account.pop("version"), start, end)
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    # Get the transactions in range as plain rows, from the archives when needed
+    transactions = await fetch_rows(db, *await ledger_statement(db, account_id, start, end))
+    
+    return FastJSONResponse({
+        "account": account,
+        "transactions": transactions,
+        "total_transactions": len(transactions)
+    }, headers={"ETag": etag})
 
+
+
+@router.post("/account/{account_id}/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_statement_job(
+    account_id: int,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Generate the statement of an account in the background.
+    
+    - **account_id**: The ID of the account
+    
+    Returns a job to poll at `GET /jobs/{job_id}`; once done, the statement
+    file is available at `GET /jobs/{job_id}/download`. While the account has
+    no new transactions the same job (and file) is returned.
+    """
+    account = await fetch_account_row(db, account_id)
+    
+    if not account:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found"
+        )
+    
+    if account["user_id"] != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to view statement for this account"
+        )
+    
+    job = await enqueue_job(db, current_user.id, account_id, STATEMENT_JOB, account["version"])
+    return job_response(job)
@@ -1,15 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
-from models.database import Transaction, Account, User, TransactionType, get_db
+from domain.rules import DEFAULT_POLICY, RuleViolation, WithdrawalPolicy, check_amount
+from models.database import User, get_db, get_read_db
+from models.queries import ACCOUNT_BY_ID
 from models.schemas import TransactionCreate, TransactionResponse
+from services.archive import ledger_statement
 from services.auth import get_current_user
+from services.etag import etag_matches, make_etag, not_modified
+from services.balances import effective_balance
+from services.cache import cached_account_row
+from services.serialization import FastJSONResponse, fetch_rows
+from services.rate_limit import limit_by_user, limit_concurrency, transaction_concurrency, transaction_limiter
+from services.transactions import TransactionRejected, apply_transaction
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
 
-@router.post("", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
+def violation_detail(violation: RuleViolation, balance: float, policy: WithdrawalPolicy) -> str:
+    """Human readable message for a violation of `policy`"""
+    if violation == RuleViolation.INVALID_AMOUNT:
+        return "Transaction amount must be greater than 0"
+    if violation == RuleViolation.PER_OPERATION_LIMIT:
+        return f"Withdrawal exceeds the per-operation limit of {policy.per_operation_limit}"
+    if violation == RuleViolation.DAILY_WITHDRAWALS:
+        return f"Daily withdrawal limit of {policy.daily_withdrawals} reached"
+    return f"Insufficient balance. Current balance: {balance}"
+
+
+@router.post(
+    "",
+    response_model=TransactionResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(limit_by_user(transaction_limiter)), Depends(limit_concurrency(transaction_concurrency))]
+)
 async def create_transaction(
     transaction_data: TransactionCreate,
     current_user: User = Depends(get_current_user),
@@ -26,17 +51,21 @@ async def create_transaction(
     **Validation Rules:**
     - Amount must be positive
     - Account must belong to the authenticated user
+    - For withdrawals, the amount must not exceed the per-operation limit
+    - For withdrawals, the daily number of withdrawals must not be exceeded
     - For withdrawals, account must have sufficient balance
+    
+    Rate limited per user and capped in concurrency (429 with `Retry-After`).
     """
     # Validate amount is positive (already validated by Pydantic, but double-check)
-    if transaction_data.amount <= 0:
+    if check_amount(transaction_data.amount):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Transaction amount must be greater than 0"
         )
     
     # Get the account
-    result = await db.execute(select(Account).where(Account.id == transaction_data.account_id))
+    result = await db.execute(ACCOUNT_BY_ID, {"account_id": transaction_data.account_id})
     account = result.scalar_one_or_none()
     
     if not account:
@@ -52,30 +81,26 @@ async def create_transaction(
             detail="Not authorized to perform transactions on this account"
         )
     
-    # Validate withdrawal balance
-    if transaction_data.transaction_type == TransactionType.WITHDRAWAL:
-        if account.balance < transaction_data.amount:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Insufficient balance. Current balance: {account.balance}"
-            )
-        # Update account balance (subtract)
-        account.balance -= transaction_data.amount
-    else:  # DEPOSIT
-        # Update account balance (add)
-        account.balance += transaction_data.amount
-    
-    # Create transaction
-    new_transaction = Transaction(
-        account_id=transaction_data.account_id,
-        transaction_type=transaction_data.transaction_type,
-        amount=transaction_data.amount,
-        description=transaction_data.description
-    )
-    
-    db.add(new_transaction)
-    await db.commit()
-    await db.refresh(new_transaction)
+    # Apply the transaction: limits, balance check and update run in the database
+    balance, buckets = account.balance, account.balance_buckets
+    policy = DEFAULT_POLICY
+    try:
+        new_transaction = await apply_transaction(
+            db,
+            account_id=transaction_data.account_id,
+            transaction_type=transaction_data.transaction_type,
+            amount=transaction_data.amount,
+            description=transaction_data.description,
+            policy=policy,
+            buckets=buckets
+        )
+    except TransactionRejected as e:
+        if buckets:
+            balance = await effective_balance(db, transaction_data.account_id)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=violation_detail(e.violation, balance, policy)
+        )
     
     return new_transaction
 
@@ -83,8 +108,9 @@ async def create_transaction(
 @router.get("/account/{account_id}", response_model=list[TransactionResponse])
 async def get_account_transactions(
     account_id: int,
+    if_none_match: Optional[str] = Header(None),
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Get all transactions for a specific account.
@@ -92,10 +118,10 @@ async def get_account_transactions(
     - **account_id**: The ID of the account
     
     Only the account owner can view their transactions.
+    Supports `ETag` / `If-None-Match`: unchanged lists return `304 Not Modified`.
     """
     # Verify account exists and belongs to user
-    result = await db.execute(select(Account).where(Account.id == account_id))
-    account = result.scalar_one_or_none()
+    account = await cached_account_row(db, account_id)
     
     if not account:
         raise HTTPException(
@@ -103,19 +129,18 @@ async def get_account_transactions(
             detail="Account not found"
         )
     
-    if account.user_id != current_user.id:
+    if account["user_id"] != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view transactions for this account"
         )
     
-    # Get all transactions for this account
-    result = await db.execute(
-        select(Transaction)
-        .where(Transaction.account_id == account_id)
-        .order_by(Transaction.created_at.desc())
-    )
-    transactions = result.scalars().all()
+    etag = make_etag("transactions", account_id, account.pop("version"))
+    if etag_matches(if_none_match, etag):
+        return not_modified(etag)
+    
+    # Get all transactions for this account, archived ones included
+    transactions = await fetch_rows(db, *await ledger_statement(db, account_id))
     
-    return list(transactions)
+    return FastJSONResponse(transactions, headers={"ETag": etag})
 
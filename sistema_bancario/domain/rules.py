@@ -0,0 +1,101 @@
+"""
+Banking rules shared by the CLI (desafio-sistema-bancario-V2.py) and the API.
+
+Everything here is pure and I/O-free: callers load the state they keep
+(balance, withdrawals already made today) and apply the outcome themselves.
+"""
+import enum
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+
+class RuleViolation(str, enum.Enum):
+    INVALID_AMOUNT = "invalid_amount"
+    PER_OPERATION_LIMIT = "per_operation_limit"
+    DAILY_WITHDRAWALS = "daily_withdrawals"
+    INSUFFICIENT_BALANCE = "insufficient_balance"
+
+
+@dataclass(frozen=True)
+class WithdrawalPolicy:
+    """Withdrawal limits of an account (None disables the limit)"""
+    per_operation_limit: Optional[float] = 500.0
+    daily_withdrawals: Optional[int] = 3
+
+
+DEFAULT_POLICY = WithdrawalPolicy()
+NO_LIMITS = WithdrawalPolicy(per_operation_limit=None, daily_withdrawals=None)
+
+
+def check_amount(amount: float) -> Optional[RuleViolation]:
+    """Check that an operation amount is positive"""
+    if amount <= 0:
+        return RuleViolation.INVALID_AMOUNT
+    return None
+
+
+def check_deposit(amount: float) -> Optional[RuleViolation]:
+    """Check a deposit, returning the violated rule or None"""
+    return check_amount(amount)
+
+
+def check_withdrawal_amount(
+    amount: float,
+    policy: WithdrawalPolicy = DEFAULT_POLICY
+) -> Optional[RuleViolation]:
+    """Check the rules that depend only on the withdrawal amount"""
+    violation = check_amount(amount)
+    if violation:
+        return violation
+    if policy.per_operation_limit is not None and amount > policy.per_operation_limit:
+        return RuleViolation.PER_OPERATION_LIMIT
+    return None
+
+
+def check_withdrawal(
+    balance: float,
+    amount: float,
+    withdrawals_today: int = 0,
+    policy: WithdrawalPolicy = DEFAULT_POLICY
+) -> Optional[RuleViolation]:
+    """
+    Check a withdrawal, returning the first violated rule or None.
+
+    Rules are checked in order: amount, per-operation limit, number of
+    withdrawals already made today and, last, the available balance.
+    """
+    violation = check_withdrawal_amount(amount, policy)
+    if violation:
+        return violation
+    if policy.daily_withdrawals is not None and withdrawals_today >= policy.daily_withdrawals:
+        return RuleViolation.DAILY_WITHDRAWALS
+    if amount > balance:
+        return RuleViolation.INSUFFICIENT_BALANCE
+    return None
+
+
+class DailyCounter:
+    """
+    Withdrawals made on the current day, kept incrementally.
+
+    Answers "how many withdrawals today?" in O(1) instead of scanning the
+    account history; the counter resets itself when the day changes.
+    """
+    __slots__ = ("day", "count", "amount")
+
+    def __init__(self):
+        self.day: Optional[date] = None
+        self.count = 0
+        self.amount = 0.0
+
+    def count_for(self, today: date) -> int:
+        return self.count if self.day == today else 0
+
+    def register(self, today: date, amount: float) -> None:
+        if self.day != today:
+            self.day = today
+            self.count = 0
+            self.amount = 0.0
+        self.count += 1
+        self.amount += amount
@@ -1,17 +1,47 @@
+import time
+_import_started = time.perf_counter()
+
+import logging
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 
+from config import settings
 from models.database import init_db
-from controllers import auth_controller, account_controller, transaction_controller, statement_controller
+from controllers import (
+    auth_controller, account_controller, transaction_controller, statement_controller, job_controller, admin_controller
+)
+from services.cache import change_feed
+from services.jobs import job_runner
+from services.profiling import loop_monitor, profiler
+
+logger = logging.getLogger("uvicorn.error")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Initialize database
+    timings = app.state.startup_timings
+    # Event-loop lag monitor first, so slow startup phases are caught too
+    if settings.loop_monitor_enabled:
+        await loop_monitor.start()
+    # Startup: Initialize database (a single version check when the schema is up to date)
+    phase_started = time.perf_counter()
     await init_db()
+    timings["init_db"] = (time.perf_counter() - phase_started) * 1000
+    # Background job workers
+    phase_started = time.perf_counter()
+    await job_runner.start()
+    timings["job_runner"] = (time.perf_counter() - phase_started) * 1000
+    # Cache invalidation feed from the other workers
+    phase_started = time.perf_counter()
+    await change_feed.start()
+    timings["change_feed"] = (time.perf_counter() - phase_started) * 1000
+    logger.info("Startup phases (ms): %s", ", ".join(f"{name}={ms:.1f}" for name, ms in timings.items()))
     yield
-    # Shutdown: Cleanup if needed
-    pass
+    # Shutdown: stop job workers (unfinished jobs are picked up again later)
+    await job_runner.stop()
+    await change_feed.stop()
+    profiler.stop()
+    await loop_monitor.stop()
 
 
 app = FastAPI(
@@ -27,6 +57,8 @@ app = FastAPI(
     * **Contas**: Criação e gerenciamento de contas correntes
     * **Transações**: Realização de depósitos e saques com validação
     * **Extratos**: Visualização de extratos bancários completos
+    * **Jobs**: Geração de extratos em segundo plano, com download do arquivo
+    * **Administração**: Métricas operacionais, restritas aos administradores
     
     ## Autenticação
     
@@ -44,6 +76,11 @@ app.include_router(auth_controller.router)
 app.include_router(account_controller.router)
 app.include_router(transaction_controller.router)
 app.include_router(statement_controller.router)
+app.include_router(job_controller.router)
+app.include_router(admin_controller.router)
+
+# Startup profile: module imports and app construction, lifespan phases are added at startup
+app.state.startup_timings = {"imports": (time.perf_counter() - _import_started) * 1000}
 
 
 @app.get("/", tags=["Root"])
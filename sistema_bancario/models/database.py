@@ -1,14 +1,80 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import declarative_base
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.engine import make_url
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Index, Enum as SQLEnum, event
+from fastapi import Request
 from datetime import datetime
+from typing import Optional
 import enum
+import time
+
+from config import settings
 
 # Database configuration
-DATABASE_URL = "sqlite+aiosqlite:///./banking.db"
+DATABASE_URL = settings.database_url
+
+
+def _read_only_url(url: str) -> Optional[str]:
+    """Read-only URL for a SQLite database file, None when there is no separate reader"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite" or parsed.database in (None, "", ":memory:"):
+        return None
+    return str(parsed.set(database=f"file:{parsed.database}", query={"mode": "ro", "uri": "true"}))
+
+
+READ_DATABASE_URL = settings.read_database_url or _read_only_url(DATABASE_URL)
+
+
+class WriterSession(Session):
+    """Session class of the writer engine (commits are tracked for read-your-writes)"""
+
+
+engine = create_async_engine(DATABASE_URL, echo=settings.database_echo)
+read_engine = create_async_engine(READ_DATABASE_URL, echo=settings.database_echo) if READ_DATABASE_URL else engine
+AsyncSessionLocal = async_sessionmaker(
+    engine, class_=AsyncSession, sync_session_class=WriterSession, expire_on_commit=False
+)
+ReadSessionLocal = async_sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        # WAL lets read-only connections read while the writer holds the lock
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+
+# client key -> monotonic time of its last commit on the writer
+_recent_writes: dict[str, float] = {}
+
+
+def _client_key(request: Request) -> Optional[str]:
+    """Identify the client of a request: its bearer token, or its address"""
+    authorization = request.headers.get("authorization")
+    if authorization:
+        return authorization
+    return request.client.host if request.client else None
 
-engine = create_async_engine(DATABASE_URL, echo=True)
-AsyncSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+@event.listens_for(WriterSession, "after_commit")
+def _remember_write(session):
+    client = session.info.get("client")
+    if client is None:
+        return
+    now = time.monotonic()
+    if len(_recent_writes) > 10_000:
+        expired = [key for key, at in _recent_writes.items() if now - at > settings.read_your_writes_seconds]
+        for key in expired:
+            del _recent_writes[key]
+    _recent_writes[client] = now
+
+
+def wrote_recently(client: Optional[str]) -> bool:
+    """Whether the client committed on the writer within the read-your-writes window"""
+    written_at = _recent_writes.get(client) if client else None
+    return written_at is not None and time.monotonic() - written_at < settings.read_your_writes_seconds
 
 Base = declarative_base()
 
@@ -18,6 +84,14 @@ class TransactionType(str, enum.Enum):
     WITHDRAWAL = "withdrawal"
 
 
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    EXPIRED = "expired"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -32,12 +106,31 @@ class Account(Base):
     __tablename__ = "accounts"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     account_number = Column(String, unique=True, index=True, nullable=False)
     balance = Column(Float, default=0.0, nullable=False)
+    # Bumped on every balance change, exposed as the ETag of account reads
+    version = Column(Integer, default=0, server_default="0", nullable=False)
+    # Hot accounts spread deposits over this many BalanceBucket rows (0 = disabled)
+    balance_buckets = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class BalanceBucket(Base):
+    """
+    Sub-balance of a hot account.
+
+    The balance of an account with buckets is accounts.balance plus the sum
+    of its buckets, and its version is accounts.version plus theirs.
+    """
+    __tablename__ = "account_balance_buckets"
+
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    balance = Column(Float, default=0.0, nullable=False)
+    version = Column(Integer, default=0, nullable=False)
+
+
 class Transaction(Base):
     __tablename__ = "transactions"
 
@@ -48,16 +141,125 @@ class Transaction(Base):
     description = Column(String, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Access path for per-account, time-ranged queries (statements, daily limits)
+        Index("ix_transactions_account_created", "account_id", "created_at"),
+    )
+
+
+class DailyLimit(Base):
+    """Per-account, per-day withdrawal counters maintained by the transaction engine"""
+    __tablename__ = "daily_limits"
+
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    withdrawals = Column(Integer, default=0, nullable=False)
+    withdrawn_amount = Column(Float, default=0.0, nullable=False)
+
+
+class Job(Base):
+    """Background job (e.g. statement file generation) processed by services.jobs"""
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    kind = Column(String, nullable=False)
+    status = Column(SQLEnum(JobStatus), nullable=False, default=JobStatus.PENDING, index=True)
+    # Account version the artifact reflects; a newer version makes it stale
+    account_version = Column(Integer, nullable=False)
+    artifact_path = Column(String, nullable=True)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_jobs_account_kind_version", "account_id", "kind", "account_version"),
+    )
+
+
+class LedgerArchive(Base):
+    """Registry of the per-month archive tables of old transactions (services.archive)"""
+    __tablename__ = "ledger_archives"
+
+    period = Column(String, primary_key=True)  # "YYYY-MM"
+    table_name = Column(String, nullable=False)
+    starts_at = Column(DateTime, nullable=False)
+    ends_at = Column(DateTime, nullable=False)
+    transactions = Column(Integer, default=0, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class LedgerSnapshot(Base):
+    """
+    Net amount of an account's archived transactions.
+
+    Its balance plus the signed sum of the live transactions equals the
+    account balance.
+    """
+    __tablename__ = "ledger_snapshots"
+
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    balance = Column(Float, default=0.0, nullable=False)
+    transactions = Column(Integer, default=0, nullable=False)
+    archived_through = Column(DateTime, nullable=False)
+
+
+class ChangeLog(Base):
+    """
+    Data changes feed, written in the transaction of the change.
+
+    Worker processes poll it by id to invalidate their local caches
+    (services.cache). AUTOINCREMENT keeps ids increasing after pruning.
+    """
+    __tablename__ = "change_log"
+
+    id = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False)
+    key = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+
+def dialect_insert(bind):
+    """INSERT construct supporting ON CONFLICT for the bind's dialect"""
+    # Imported here so SQLite deployments never load the Postgres dialect
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects import postgresql
+        return postgresql.insert
+    from sqlalchemy.dialects import sqlite
+    return sqlite.insert
+
 
 async def init_db():
-    """Initialize database tables"""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Bring the database schema up to date (a single version query when it already is)"""
+    from models.migrations import upgrade
+    await upgrade(engine)
 
 
-async def get_db():
-    """Dependency to get database session"""
+async def get_db(request: Request):
+    """Dependency to get a writer database session"""
     async with AsyncSessionLocal() as session:
+        session.info["client"] = _client_key(request)
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+async def get_read_db(request: Request):
+    """
+    Dependency to get a reader database session.
+
+    Clients that committed within the read-your-writes window get a writer
+    session instead, so they always see their own changes.
+    """
+    session_factory = ReadSessionLocal
+    if read_engine is not engine and wrote_recently(_client_key(request)):
+        session_factory = AsyncSessionLocal
+    async with session_factory() as session:
         try:
             yield session
         finally:
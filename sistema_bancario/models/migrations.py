@@ -0,0 +1,307 @@
+"""
+Schema migrations for the banking database.
+
+Each migration is an async function registered with @migration(version, ...)
+and must be idempotent (check before altering), so it can run on databases
+created by any earlier `create_all`. Applied versions are recorded in the
+`schema_migrations` table.
+
+Workers booting together may all find a migration pending and apply it at
+the same time: the DDL helpers below treat losing that race ("already
+exists", "duplicate column") as success.
+
+Usage (from the sistema_bancario directory):
+
+    python -m models.migrations upgrade
+    python -m models.migrations current
+    python -m models.migrations history
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from sqlalchemy import (
+    Column, DateTime, Index, Integer, MetaData, String, Table,
+    and_, func, inspect, insert, select, text
+)
+from sqlalchemy.exc import DBAPIError, IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models.database import (
+    Account, BalanceBucket, Base, ChangeLog, DailyLimit, Job, LedgerArchive, LedgerSnapshot,
+    Transaction, TransactionType, User, engine
+)
+
+# Kept out of Base.metadata: it is managed by this module only
+migrations_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    migrations_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, default=datetime.utcnow),
+)
+
+BACKFILL_BATCH_SIZE = 1000
+DDL_ATTEMPTS = 5
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[AsyncEngine], Awaitable[None]]
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, description: str):
+    """Register a migration function"""
+    def register(func):
+        MIGRATIONS.append(Migration(version, description, func))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return register
+
+
+def head_version() -> int:
+    return MIGRATIONS[-1].version if MIGRATIONS else 0
+
+
+# Helpers ---------------------------------------------------------------------
+
+def _lost_ddl_race(error: DBAPIError) -> bool:
+    """Whether a DDL error means another worker created the object first"""
+    message = str(error.orig).lower()
+    return (
+        "already exists" in message
+        or "duplicate column" in message
+        # Postgres catalog race of concurrent CREATE ... IF NOT EXISTS
+        or 'duplicate key value violates unique constraint "pg_' in message
+    )
+
+
+async def _run_ddl(engine: AsyncEngine, step: Callable, autocommit: bool = False) -> None:
+    """
+    Run a check-then-create DDL step, retrying it when a concurrent worker wins the race.
+
+    The retry checks again and finds the object in place; steps creating
+    several objects make progress on each attempt.
+    """
+    for attempt in range(DDL_ATTEMPTS):
+        try:
+            if autocommit:
+                async with engine.execution_options(isolation_level="AUTOCOMMIT").connect() as conn:
+                    await step(conn)
+            else:
+                async with engine.begin() as conn:
+                    await step(conn)
+            return
+        except DBAPIError as e:
+            if not _lost_ddl_race(e) or attempt == DDL_ATTEMPTS - 1:
+                raise
+
+
+async def create_tables(engine: AsyncEngine, *tables: Table) -> None:
+    """Create the given tables (and their indexes) if they don't exist"""
+    async def step(conn):
+        await conn.run_sync(Base.metadata.create_all, tables=list(tables))
+    await _run_ddl(engine, step)
+
+
+async def add_column(engine: AsyncEngine, table: str, column: str, ddl: str) -> None:
+    """
+    Add a column if missing.
+
+    `ddl` is the column type and constraints, e.g. "INTEGER NOT NULL DEFAULT 0".
+    With a constant default this is a metadata-only change on SQLite and
+    Postgres 11+, so it does not rewrite the table.
+    """
+    async def step(conn):
+        columns = await conn.run_sync(lambda c: {col["name"] for col in inspect(c).get_columns(table)})
+        if column not in columns:
+            await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+    await _run_ddl(engine, step)
+
+
+async def create_index(engine: AsyncEngine, index: Index) -> None:
+    """
+    Create an index if missing without blocking reads.
+
+    Postgres builds it with CREATE INDEX CONCURRENTLY (outside a transaction),
+    so writes keep flowing too. SQLite has no concurrent build: the build holds
+    the write lock, but in WAL mode readers are served throughout.
+    """
+    if engine.dialect.name == "postgresql":
+        columns = ", ".join(column.name for column in index.columns)
+
+        async def step(conn):
+            await conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON {index.table.name} ({columns})"
+            ))
+        await _run_ddl(engine, step, autocommit=True)
+        return
+
+    async def step(conn):
+        await conn.run_sync(lambda c: index.create(c, checkfirst=True))
+    await _run_ddl(engine, step)
+
+
+async def backfill(
+    engine: AsyncEngine,
+    key_column: Column,
+    build_statement: Callable[[int, int], object],
+    batch_size: int = BACKFILL_BATCH_SIZE
+) -> int:
+    """
+    Run a data backfill in key ranges, one short transaction per range.
+
+    `build_statement(low, high)` returns the DML for keys in [low, high).
+    Committing per batch releases the writer lock between ranges so request
+    traffic interleaves with the backfill. Returns the number of batches.
+    """
+    async with engine.connect() as conn:
+        bounds = (await conn.execute(select(func.min(key_column), func.max(key_column)))).one()
+    if bounds[0] is None:
+        return 0
+
+    batches = 0
+    for low in range(bounds[0], bounds[1] + 1, batch_size):
+        async with engine.begin() as conn:
+            await conn.execute(build_statement(low, low + batch_size))
+        batches += 1
+        await asyncio.sleep(0)
+    return batches
+
+
+# Migrations ------------------------------------------------------------------
+
+@migration(1, "initial schema: users, accounts, transactions")
+async def _initial_schema(engine: AsyncEngine) -> None:
+    await create_tables(engine, User.__table__, Account.__table__, Transaction.__table__)
+
+
+@migration(2, "accounts.version for ETags")
+async def _account_version(engine: AsyncEngine) -> None:
+    await add_column(engine, "accounts", "version", "INTEGER NOT NULL DEFAULT 0")
+
+
+@migration(3, "indexes on accounts.user_id and transactions(account_id, created_at)")
+async def _access_path_indexes(engine: AsyncEngine) -> None:
+    for index in (*Account.__table__.indexes, *Transaction.__table__.indexes):
+        await create_index(engine, index)
+
+
+@migration(4, "daily_limits table, backfilled from today's withdrawals")
+async def _daily_limits(engine: AsyncEngine) -> None:
+    await create_tables(engine, DailyLimit.__table__)
+
+    start_of_day = datetime.combine(datetime.utcnow().date(), datetime.min.time())
+
+    def build_statement(low: int, high: int):
+        todays_withdrawals = (
+            select(
+                Transaction.account_id,
+                func.date(Transaction.created_at),
+                func.count(Transaction.id),
+                func.sum(Transaction.amount),
+            )
+            .where(and_(
+                Transaction.account_id >= low,
+                Transaction.account_id < high,
+                Transaction.transaction_type == TransactionType.WITHDRAWAL,
+                Transaction.created_at >= start_of_day,
+            ))
+            .group_by(Transaction.account_id, func.date(Transaction.created_at))
+        )
+        columns = ["account_id", "day", "withdrawals", "withdrawn_amount"]
+        if engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects import postgresql
+            return postgresql.insert(DailyLimit).from_select(columns, todays_withdrawals).on_conflict_do_nothing()
+        return insert(DailyLimit).from_select(columns, todays_withdrawals).prefix_with("OR IGNORE")
+
+    await backfill(engine, Account.id, build_statement)
+
+
+@migration(5, "hot-account balance buckets")
+async def _balance_buckets(engine: AsyncEngine) -> None:
+    await add_column(engine, "accounts", "balance_buckets", "INTEGER NOT NULL DEFAULT 0")
+    await create_tables(engine, BalanceBucket.__table__)
+
+
+@migration(6, "background jobs table")
+async def _jobs(engine: AsyncEngine) -> None:
+    await create_tables(engine, Job.__table__)
+
+
+@migration(7, "change log for cache invalidation")
+async def _change_log(engine: AsyncEngine) -> None:
+    await create_tables(engine, ChangeLog.__table__)
+
+
+@migration(8, "ledger archive registry and snapshots")
+async def _ledger_archives(engine: AsyncEngine) -> None:
+    await create_tables(engine, LedgerArchive.__table__, LedgerSnapshot.__table__)
+
+
+# Runner ----------------------------------------------------------------------
+
+async def current_version(engine: AsyncEngine) -> int:
+    """Latest applied version (0 for a database without migrations), in a single query"""
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(select(func.max(schema_migrations.c.version)))
+            return result.scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+
+async def upgrade(engine: AsyncEngine = engine) -> list[Migration]:
+    """Apply pending migrations and return them; a no-op on an up-to-date database"""
+    version = await current_version(engine)
+    pending = [m for m in MIGRATIONS if m.version > version]
+    if not pending:
+        return []
+
+    async def create_schema_migrations(conn):
+        await conn.run_sync(migrations_metadata.create_all)
+    await _run_ddl(engine, create_schema_migrations)
+
+    for m in pending:
+        await m.apply(engine)
+        try:
+            async with engine.begin() as conn:
+                await conn.execute(insert(schema_migrations).values(version=m.version, description=m.description))
+        except IntegrityError:
+            # Another worker applied and recorded it concurrently
+            pass
+    return pending
+
+
+async def _main(command: str) -> None:
+    if command == "upgrade":
+        applied = await upgrade(engine)
+        for m in applied:
+            print(f"applied {m.version}: {m.description}")
+        print(f"database at version {await current_version(engine)} (head {head_version()})")
+    elif command == "current":
+        print(f"database at version {await current_version(engine)} (head {head_version()})")
+    elif command == "history":
+        current = await current_version(engine)
+        for m in MIGRATIONS:
+            print(f"{'x' if m.version <= current else ' '} {m.version}: {m.description}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banking database migrations")
+    parser.add_argument("command", choices=["upgrade", "current", "history"])
+    args = parser.parse_args()
+    asyncio.run(_main(args.command))
+
+
+if __name__ == "__main__":
+    main()
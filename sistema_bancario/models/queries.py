@@ -0,0 +1,22 @@
+"""
+Hot queries, built once at import.
+
+Statements take their values through bind parameters, so each request
+executes the same statement object: no construct is rebuilt per request and
+SQLAlchemy's compiled cache is hit directly. Execute them with the values as
+parameters, e.g. `db.execute(USER_BY_USERNAME, {"username": name})`.
+
+Statements with optional filters are prebuilt once per combination of
+filters, in dicts keyed by which filters are present (services.archive
+LIVE_STATEMENTS / ARCHIVED_PERIODS), and executed the same way.
+"""
+from sqlalchemy import bindparam, select
+
+from models.database import Account, User
+
+USER_BY_USERNAME = select(User).where(User.username == bindparam("username"))
+USER_BY_EMAIL = select(User).where(User.email == bindparam("email"))
+
+ACCOUNT_BY_ID = select(Account).where(Account.id == bindparam("account_id"))
+ACCOUNT_BY_NUMBER = select(Account).where(Account.account_number == bindparam("account_number"))
+ACCOUNT_IDS_BY_USER = select(Account.id).where(Account.user_id == bindparam("user_id")).order_by(Account.id)
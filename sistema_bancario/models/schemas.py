@@ -1,7 +1,8 @@
 from pydantic import BaseModel, EmailStr, Field
 from datetime import datetime
+import enum
 from typing import Optional, List
-from models.database import TransactionType
+from models.database import JobStatus, TransactionType
 
 
 # User schemas
@@ -64,6 +65,83 @@ class StatementResponse(BaseModel):
     total_transactions: int
 
 
+# Analytics schemas
+class Granularity(str, enum.Enum):
+    DAY = "day"
+    MONTH = "month"
+
+
+class ActivityBucket(BaseModel):
+    period: str
+    deposits: float
+    withdrawals: float
+    deposit_count: int
+    withdrawal_count: int
+    net: float
+    # End-of-period balance, when running balances are requested
+    balance: Optional[float] = None
+
+
+class AnalyticsResponse(BaseModel):
+    account_ids: List[int]
+    granularity: Granularity
+    buckets: List[ActivityBucket]
+
+
+# Admin schemas
+class BcryptCostStats(BaseModel):
+    rounds: int
+    count: int
+    mean_ms: float
+    max_ms: float
+
+
+class BcryptMetricsResponse(BaseModel):
+    configured_rounds: int
+    rehashed_passwords: int
+    verify_latency: List[BcryptCostStats]
+
+
+class SlowSection(BaseModel):
+    started_at: datetime
+    duration_ms: float
+    # Collapsed stacks ("file:function;file:function") sampled while the loop was blocked
+    stacks: List[str]
+
+
+class LoopStatsResponse(BaseModel):
+    interval_ms: float
+    threshold_ms: float
+    lag_p50_ms: float
+    lag_p99_ms: float
+    lag_max_ms: float
+    slow_sections: List[SlowSection]
+
+
+class ProfilerStatus(BaseModel):
+    running: bool
+    interval_ms: float
+    samples: int
+    # Collapsed-stack file written when the profiler stops
+    path: Optional[str] = None
+
+
+# Job schemas
+class JobResponse(BaseModel):
+    id: int
+    account_id: int
+    kind: str
+    status: JobStatus
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    error: Optional[str]
+    download_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+
 # Authentication schemas
 class Token(BaseModel):
     access_token: str
@@ -0,0 +1,99 @@
+"""
+Account activity aggregates.
+
+Per-day or per-month deposit and withdrawal totals are computed in the
+database with a GROUP BY over the (account_id, created_at) index of the
+ledger, archived periods included when the range reaches them, so only one
+row per period leaves the database.
+
+Running balances are derived backwards from the current balance (no scan
+of the history before the range): the balance at the end of the range is
+the current balance minus the net of everything after it. The cumulative
+sum uses NumPy when it is installed (`pip install .[analytics]`).
+"""
+from datetime import datetime
+from itertools import accumulate
+from typing import Optional, Sequence
+
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database import Account, TransactionType
+from models.schemas import Granularity
+from services.archive import ledger_source
+from services.balances import EFFECTIVE_BALANCE
+from services.serialization import fetch_rows
+
+# strftime (SQLite) and to_char (Postgres) formats of the period labels
+PERIOD_FORMATS = {
+    Granularity.DAY: ("%Y-%m-%d", "YYYY-MM-DD"),
+    Granularity.MONTH: ("%Y-%m", "YYYY-MM"),
+}
+
+
+def _period(column, granularity: Granularity, dialect: str):
+    sqlite_format, postgres_format = PERIOD_FORMATS[granularity]
+    if dialect == "postgresql":
+        return func.to_char(column, postgres_format)
+    return func.strftime(sqlite_format, column)
+
+
+def _running_balances(nets: list[float], closing: float) -> list[float]:
+    """End-of-period balances given the period nets and the balance after the last one"""
+    try:
+        import numpy as np
+    except ImportError:
+        total = sum(nets)
+        return [closing - total + running for running in accumulate(nets)]
+    cumulative = np.cumsum(np.asarray(nets, dtype=np.float64))
+    return (closing - cumulative[-1] + cumulative).tolist()
+
+
+async def _net_since(db: AsyncSession, account_ids: Sequence[int], start: datetime) -> float:
+    ledger = await ledger_source(db, account_ids, start)
+    signed = case((ledger.c.transaction_type == TransactionType.WITHDRAWAL, -ledger.c.amount), else_=ledger.c.amount)
+    result = await db.execute(select(func.coalesce(func.sum(signed), 0.0)))
+    return result.scalar_one()
+
+
+async def activity(
+    db: AsyncSession,
+    account_ids: Sequence[int],
+    granularity: Granularity,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    running_balance: bool = False
+) -> list[dict]:
+    """ActivityBucket rows of the accounts combined, oldest period first"""
+    if not account_ids:
+        return []
+    ledger = await ledger_source(db, account_ids, start, end)
+    period = _period(ledger.c.created_at, granularity, db.bind.dialect.name).label("period")
+    is_deposit = ledger.c.transaction_type == TransactionType.DEPOSIT
+    rows = await fetch_rows(
+        db,
+        select(
+            period,
+            func.sum(case((is_deposit, ledger.c.amount), else_=0.0)).label("deposits"),
+            func.sum(case((is_deposit, 0.0), else_=ledger.c.amount)).label("withdrawals"),
+            func.count(case((is_deposit, 1))).label("deposit_count"),
+            func.count(case((is_deposit, None), else_=1)).label("withdrawal_count"),
+        )
+        .group_by(period)
+        .order_by(period)
+    )
+    for row in rows:
+        row["net"] = row["deposits"] - row["withdrawals"]
+        row["balance"] = None
+
+    if running_balance and rows:
+        result = await db.execute(
+            select(func.coalesce(func.sum(EFFECTIVE_BALANCE.element), 0.0)).where(Account.id.in_(account_ids))
+        )
+        closing = result.scalar_one()
+        if end:
+            closing -= await _net_since(db, account_ids, end)
+        balances = _running_balances([row["net"] for row in rows], closing)
+        for row, balance in zip(rows, balances):
+            row["balance"] = balance
+    return rows
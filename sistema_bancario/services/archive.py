@@ -0,0 +1,285 @@
+"""
+Ledger archiving.
+
+Transactions older than a cutoff month are moved, one month per table, from
+`transactions` into `transactions_archive_YYYYMM` tables registered in
+`ledger_archives`. The net amount of the moved transactions is added to the
+account's `ledger_snapshots` row, so the snapshot plus the live transactions
+still add up to the account balance.
+
+Rows move in batches, each batch in one short transaction (copy, snapshot,
+delete), so a run can be interrupted and resumed and requests keep flowing.
+Statement reads go through ledger_statement(), which only adds the archive
+tables whose month overlaps the requested date range.
+
+Usage (from the sistema_bancario directory):
+
+    python -m services.archive run --before 2025-01
+    python -m services.archive list
+"""
+import argparse
+import asyncio
+from datetime import datetime
+from typing import Optional, Sequence
+
+from sqlalchemy import (
+    Column, DateTime, Enum as SQLEnum, Float, Index, Integer, MetaData, Select, String, Subquery, Table,
+    bindparam, case, delete, func, insert, select, union_all, update
+)
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from models.database import LedgerArchive, LedgerSnapshot, Transaction, TransactionType, dialect_insert, engine
+from services.serialization import TRANSACTION_COLUMNS
+
+ARCHIVE_BATCH_SIZE = 1000
+
+# Amount with the sign of its effect on the balance
+SIGNED_AMOUNT = case(
+    (Transaction.transaction_type == TransactionType.WITHDRAWAL, -Transaction.amount),
+    else_=Transaction.amount
+)
+
+# Archive tables are created on demand, outside Base.metadata
+archive_metadata = MetaData()
+
+
+def period_bounds(period: str) -> tuple[datetime, datetime]:
+    """[start, end) of a "YYYY-MM" period"""
+    start = datetime.strptime(period, "%Y-%m")
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
+
+
+def archive_table(period: str) -> Table:
+    """Table holding the archived transactions of a period"""
+    name = f"transactions_archive_{period.replace('-', '')}"
+    table = archive_metadata.tables.get(name)
+    if table is None:
+        table = Table(
+            name,
+            archive_metadata,
+            Column("id", Integer, primary_key=True),
+            Column("account_id", Integer, nullable=False),
+            Column("transaction_type", SQLEnum(TransactionType), nullable=False),
+            Column("amount", Float, nullable=False),
+            Column("description", String, nullable=True),
+            Column("created_at", DateTime),
+            Index(f"ix_{name}_account_created", "account_id", "created_at"),
+        )
+    return table
+
+
+def _ledger_select(
+    table: Table,
+    account_ids: Sequence[int],
+    start: Optional[datetime],
+    end: Optional[datetime]
+) -> Select:
+    stmt = select(*(table.c[column.key] for column in TRANSACTION_COLUMNS))
+    if len(account_ids) == 1:
+        stmt = stmt.where(table.c.account_id == account_ids[0])
+    else:
+        stmt = stmt.where(table.c.account_id.in_(account_ids))
+    if start:
+        stmt = stmt.where(table.c.created_at >= start)
+    if end:
+        stmt = stmt.where(table.c.created_at < end)
+    return stmt
+
+
+def _periods_query(has_start: bool, has_end: bool) -> Select:
+    query = select(LedgerArchive.period)
+    if has_start:
+        query = query.where(LedgerArchive.ends_at > bindparam("start"))
+    if has_end:
+        query = query.where(LedgerArchive.starts_at < bindparam("end"))
+    return query.order_by(LedgerArchive.period.desc())
+
+
+def _live_query(has_start: bool, has_end: bool) -> Select:
+    stmt = select(*TRANSACTION_COLUMNS).where(Transaction.account_id == bindparam("account_id"))
+    if has_start:
+        stmt = stmt.where(Transaction.created_at >= bindparam("start"))
+    if has_end:
+        stmt = stmt.where(Transaction.created_at < bindparam("end"))
+    return stmt.order_by(Transaction.created_at.desc())
+
+
+# Both run on every statement read: built once per combination of range bounds
+BOUNDS = [(has_start, has_end) for has_start in (False, True) for has_end in (False, True)]
+ARCHIVED_PERIODS = {bounds: _periods_query(*bounds) for bounds in BOUNDS}
+LIVE_STATEMENTS = {bounds: _live_query(*bounds) for bounds in BOUNDS}
+
+
+def _range_params(start: Optional[datetime], end: Optional[datetime]) -> dict:
+    params = {}
+    if start:
+        params["start"] = start
+    if end:
+        params["end"] = end
+    return params
+
+
+async def _archived_periods(conn, start: Optional[datetime], end: Optional[datetime]) -> list[str]:
+    """Archived periods overlapping [start, end), newest first"""
+    query = ARCHIVED_PERIODS[bool(start), bool(end)]
+    return (await conn.execute(query, _range_params(start, end))).scalars().all()
+
+
+async def ledger_source(
+    conn,
+    account_ids: Sequence[int],
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> Subquery:
+    """
+    Transactions of the accounts in [start, end) as a subquery, for aggregates.
+
+    `conn` is a session or connection, used to look up the archived periods
+    overlapping the range; ranges within the live table query it alone.
+    """
+    live = _ledger_select(Transaction.__table__, account_ids, start, end)
+    periods = await _archived_periods(conn, start, end)
+    if not periods:
+        return live.subquery("ledger")
+    return union_all(
+        live, *(_ledger_select(archive_table(period), account_ids, start, end) for period in periods)
+    ).subquery("ledger")
+
+
+async def ledger_statement(
+    conn,
+    account_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> tuple[Select, dict]:
+    """
+    Select an account's transactions in [start, end), newest first, reading archives like ledger_source().
+
+    Returns the statement and its parameters, to execute as `execute(stmt, params)`:
+    ranges within the live table use a prebuilt statement.
+    """
+    periods = await _archived_periods(conn, start, end)
+    if not periods:
+        return LIVE_STATEMENTS[bool(start), bool(end)], {"account_id": account_id, **_range_params(start, end)}
+    live = _ledger_select(Transaction.__table__, [account_id], start, end)
+    ledger = union_all(
+        live, *(_ledger_select(archive_table(period), [account_id], start, end) for period in periods)
+    ).subquery()
+    # Labelled with plain str keys (result keys of a union are quoted_name, which orjson rejects)
+    stmt = select(*(ledger.c[column.key].label(column.key) for column in TRANSACTION_COLUMNS)).order_by(
+        ledger.c.created_at.desc()
+    )
+    return stmt, {}
+
+
+async def archive_period(engine: AsyncEngine, period: str, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """Move the transactions of a period to its archive table; returns how many were moved"""
+    start, end = period_bounds(period)
+    table = archive_table(period)
+    columns = [column.key for column in TRANSACTION_COLUMNS]
+
+    # Register the table before any row lands in it, so reads include it
+    async with engine.begin() as conn:
+        await conn.run_sync(archive_metadata.create_all, tables=[table])
+        await conn.execute(
+            dialect_insert(conn)(LedgerArchive)
+            .values(period=period, table_name=table.name, starts_at=start, ends_at=end)
+            .on_conflict_do_nothing()
+        )
+
+    moved = 0
+    while True:
+        async with engine.begin() as conn:
+            ids = (await conn.execute(
+                select(Transaction.id)
+                .where(Transaction.created_at >= start)
+                .where(Transaction.created_at < end)
+                .order_by(Transaction.id)
+                .limit(batch_size)
+            )).scalars().all()
+            if not ids:
+                break
+            batch = Transaction.id.in_(ids)
+
+            await conn.execute(
+                insert(table).from_select(columns, select(*(getattr(Transaction, c) for c in columns)).where(batch))
+            )
+            totals = (await conn.execute(
+                select(Transaction.account_id, func.sum(SIGNED_AMOUNT), func.count())
+                .where(batch)
+                .group_by(Transaction.account_id)
+            )).all()
+            upsert = dialect_insert(conn)(LedgerSnapshot)
+            await conn.execute(
+                upsert.on_conflict_do_update(
+                    index_elements=[LedgerSnapshot.account_id],
+                    set_={
+                        "balance": LedgerSnapshot.balance + upsert.excluded.balance,
+                        "transactions": LedgerSnapshot.transactions + upsert.excluded.transactions,
+                        "archived_through": upsert.excluded.archived_through,
+                    }
+                ),
+                [
+                    {"account_id": account_id, "balance": amount, "transactions": count, "archived_through": end}
+                    for account_id, amount, count in totals
+                ]
+            )
+            await conn.execute(delete(Transaction).where(batch))
+            await conn.execute(
+                update(LedgerArchive)
+                .where(LedgerArchive.period == period)
+                .values(transactions=LedgerArchive.transactions + len(ids))
+            )
+        moved += len(ids)
+        await asyncio.sleep(0)
+    return moved
+
+
+async def archive_before(engine: AsyncEngine, before: str, batch_size: int = ARCHIVE_BATCH_SIZE) -> dict[str, int]:
+    """Archive every month with transactions before the `before` period, oldest first"""
+    cutoff, _ = period_bounds(before)
+    moved = {}
+    while True:
+        # Archived months are emptied, so this skips straight to the next month with rows
+        async with engine.connect() as conn:
+            oldest = (await conn.execute(
+                select(func.min(Transaction.created_at)).where(Transaction.created_at < cutoff)
+            )).scalar()
+        if oldest is None:
+            return moved
+        period = oldest.strftime("%Y-%m")
+        moved[period] = await archive_period(engine, period, batch_size)
+
+
+async def _main(args) -> None:
+    if args.command == "run":
+        moved = await archive_before(engine, args.before, args.batch_size)
+        for period, count in moved.items():
+            print(f"{period}: {count} transactions archived")
+        if not moved:
+            print(f"no transactions before {args.before}")
+    else:
+        async with engine.connect() as conn:
+            rows = (await conn.execute(
+                select(LedgerArchive.period, LedgerArchive.table_name, LedgerArchive.transactions)
+                .order_by(LedgerArchive.period)
+            )).all()
+        for period, table_name, count in rows:
+            print(f"{period}  {table_name}  {count} transactions")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old transactions into per-month tables")
+    parser.add_argument("command", choices=["run", "list"])
+    parser.add_argument("--before", help='archive the months before this one ("YYYY-MM")')
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    if args.command == "run" and not args.before:
+        parser.error("run requires --before")
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,24 @@
+import argparse
+import asyncio
+import functools
+import logging
+import threading
+import time
+from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
-import bcrypt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import update
 
-from models.database import User, get_db
+from config import settings
+from models.database import AsyncSessionLocal, User, get_read_db
+from models.queries import USER_BY_EMAIL, USER_BY_USERNAME
 from models.schemas import TokenData
+from services.cache import USER, record_change, session_generation, user_cache
+
+logger = logging.getLogger("uvicorn.error")
 
 # Security configuration
 SECRET_KEY = "your-secret-key-change-in-production"  # In production, use environment variable
@@ -16,13 +26,60 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 # Bcrypt configuration
-BCRYPT_ROUNDS = 12
+BCRYPT_ROUNDS = settings.bcrypt_rounds
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# jose (with its cryptography backend) and bcrypt are imported on first use,
+# keeping them off the application cold start.
+
+
+@functools.cache
+def _jose():
+    """jose's jwt module and JWTError, imported once on first use"""
+    from jose import JWTError, jwt
+    return jwt, JWTError
+
+
+@dataclass
+class VerifyStats:
+    """Latency of password verifications at one bcrypt cost"""
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def observe(self, ms: float) -> None:
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+
+# bcrypt cost -> verification latency in this process, updated from to_thread workers
+verify_latency: dict[int, VerifyStats] = {}
+_verify_latency_lock = threading.Lock()
+rehashed_passwords = 0
+# Rehash tasks in flight (referenced so they are not garbage collected)
+_rehash_tasks: set[asyncio.Task] = set()
+
+
+def hash_cost(hashed_password: str) -> Optional[int]:
+    """Cost (log2 rounds) of a bcrypt hash such as $2b$12$..."""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def verify_latency_snapshot() -> list[tuple[int, VerifyStats]]:
+    """Copies of the verification stats, by bcrypt cost"""
+    with _verify_latency_lock:
+        return [(cost, replace(stats)) for cost, stats in sorted(verify_latency.items())]
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
+    import bcrypt
+    started = time.perf_counter()
     try:
         # bcrypt.checkpw expects bytes
         return bcrypt.checkpw(
@@ -31,17 +88,24 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         )
     except Exception:
         return False
+    finally:
+        cost = hash_cost(hashed_password)
+        if cost is not None:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with _verify_latency_lock:
+                verify_latency.setdefault(cost, VerifyStats()).observe(elapsed_ms)
 
 
-def get_password_hash(password: str) -> str:
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
     """Hash a password using bcrypt directly"""
+    import bcrypt
     # Validate password length first (bcrypt limit is 72 bytes)
     password_bytes = password.encode('utf-8')
     if len(password_bytes) > 72:
         raise ValueError(f"Password cannot exceed 72 bytes. Got {len(password_bytes)} bytes.")
     
     # Generate salt and hash password
-    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    salt = bcrypt.gensalt(rounds=rounds or BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     
     # Return as string (bcrypt hash is always a valid string)
@@ -50,6 +114,7 @@ def get_password_hash(password: str) -> str:
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
+    jwt, _ = _jose()
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -62,31 +127,63 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
 
 async def get_user_by_username(db: AsyncSession, username: str) -> Optional[User]:
     """Get user by username"""
-    result = await db.execute(select(User).where(User.username == username))
+    result = await db.execute(USER_BY_USERNAME, {"username": username})
     return result.scalar_one_or_none()
 
 
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
     """Get user by email"""
-    result = await db.execute(select(User).where(User.email == email))
+    result = await db.execute(USER_BY_EMAIL, {"email": email})
     return result.scalar_one_or_none()
 
 
+async def _rehash_password(user_id: int, username: str, password: str, old_hash: str) -> None:
+    """Store the password hashed with the configured cost, unless the hash changed meanwhile"""
+    global rehashed_passwords
+    try:
+        new_hash = await asyncio.to_thread(get_password_hash, password)
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                update(User)
+                .where(User.id == user_id)
+                .where(User.hashed_password == old_hash)
+                .values(hashed_password=new_hash)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount:
+                await record_change(db, USER, username)
+            await db.commit()
+        rehashed_passwords += result.rowcount
+    except Exception:
+        logger.exception("Password rehash failed for user %s", user_id)
+
+
 async def authenticate_user(db: AsyncSession, username: str, password: str) -> Optional[User]:
-    """Authenticate a user"""
+    """
+    Authenticate a user.
+
+    Verification runs in a thread (bcrypt releases the GIL) so the event
+    loop keeps serving other requests. When the stored hash has another
+    cost than the configured one, it is rehashed in the background.
+    """
     user = await get_user_by_username(db, username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await asyncio.to_thread(verify_password, password, user.hashed_password):
         return None
+    if hash_cost(user.hashed_password) != BCRYPT_ROUNDS:
+        task = asyncio.create_task(_rehash_password(user.id, user.username, password, user.hashed_password))
+        _rehash_tasks.add(task)
+        task.add_done_callback(_rehash_tasks.discard)
     return user
 
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ) -> User:
     """Get current authenticated user from JWT token"""
+    jwt, JWTError = _jose()
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -100,8 +197,65 @@ async def get_current_user(
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = await get_user_by_username(db, username=token_data.username)
+    user = user_cache.get(token_data.username)
     if user is None:
-        raise credentials_exception
+        user = await get_user_by_username(db, username=token_data.username)
+        if user is None:
+            raise credentials_exception
+        # Shared read-only between requests of this worker
+        db.expunge(user)
+        user_cache.set(user.username, user, session_generation(db))
     return user
 
+
+
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    """Require an authenticated user listed in settings.admin_usernames"""
+    if current_user.username not in settings.admin_usernames:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
+
+
+def calibrate(target_ms: float, samples: int = 3, min_rounds: int = 4, max_rounds: int = 16) -> tuple[int, dict[int, float]]:
+    """
+    Measure the verify time of each bcrypt cost on this host.
+
+    Returns the highest cost whose median verify time fits the target (the
+    cost doubles the work per step, so measuring stops past the target) and
+    the timings per cost.
+    """
+    import bcrypt
+    timings = {}
+    chosen = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        hashed = bcrypt.hashpw(b"calibration", bcrypt.gensalt(rounds=rounds))
+        runs = []
+        for _ in range(samples):
+            started = time.perf_counter()
+            bcrypt.checkpw(b"calibration", hashed)
+            runs.append((time.perf_counter() - started) * 1000)
+        timings[rounds] = sorted(runs)[len(runs) // 2]
+        if timings[rounds] > target_ms:
+            break
+        chosen = rounds
+    return chosen, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Password hashing tools")
+    parser.add_argument("command", choices=["calibrate"])
+    parser.add_argument("--target-ms", type=float, default=250.0, help="target verify time per login")
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args()
+
+    chosen, timings = calibrate(args.target_ms, args.samples)
+    for rounds, ms in timings.items():
+        print(f"rounds={rounds:<3} {ms:>9.1f} ms{'  <- chosen' if rounds == chosen else ''}")
+    print(f"configured: {BCRYPT_ROUNDS}; set BANKING_BCRYPT_ROUNDS={chosen} for ~{args.target_ms:.0f} ms per verify")
+
+
+if __name__ == "__main__":
+    main()
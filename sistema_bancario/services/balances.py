@@ -0,0 +1,136 @@
+"""
+Bucketed balances for hot accounts.
+
+Every deposit to an account normally updates its single accounts row, so
+concurrent deposits to a popular account serialize on that row lock. With
+balance_buckets = N > 0 deposits go to one of N account_balance_buckets rows
+picked at random instead, and the balance is read as the account row plus
+the sum of its buckets. Withdrawals debit the account row and, when it runs
+short, sweep the buckets into it first.
+
+Enable or disable (from the sistema_bancario directory):
+
+    python -m services.balances <account_id> --buckets 8
+    python -m services.balances <account_id> --buckets 0
+"""
+import argparse
+import asyncio
+import random
+
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database import Account, AsyncSessionLocal, BalanceBucket, dialect_insert
+
+buckets_table = BalanceBucket.__table__
+
+
+def _bucket_total(column):
+    """Sum of a bucket column for the account of the enclosing query (0 without buckets)"""
+    total = (
+        select(func.coalesce(func.sum(column), 0))
+        .where(BalanceBucket.account_id == Account.id)
+        .scalar_subquery()
+    )
+    # CASE short-circuits, so regular accounts never run the subquery
+    return case((Account.balance_buckets > 0, total), else_=0)
+
+
+# Column expressions for reads: use them wherever Account.balance / version are exposed
+EFFECTIVE_BALANCE = (Account.balance + _bucket_total(BalanceBucket.balance)).label("balance")
+EFFECTIVE_VERSION = (Account.version + _bucket_total(BalanceBucket.version)).label("version")
+
+
+async def deposit_to_bucket(db: AsyncSession, account_id: int, buckets: int, amount: float) -> None:
+    """Add a deposit to a random bucket of a hot account, leaving the account row untouched"""
+    insert = dialect_insert(db.bind)
+    stmt = insert(BalanceBucket).values(
+        account_id=account_id,
+        bucket=random.randrange(buckets),
+        balance=amount,
+        version=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BalanceBucket.account_id, BalanceBucket.bucket],
+        set_={
+            "balance": BalanceBucket.balance + stmt.excluded.balance,
+            "version": BalanceBucket.version + 1,
+        }
+    )
+    await db.execute(stmt)
+
+
+async def sweep_buckets(db: AsyncSession, account_id: int) -> float:
+    """
+    Move the money in an account's buckets to its account row.
+
+    Buckets are decremented by the amount read rather than zeroed, so
+    deposits landing concurrently in a bucket are kept. The bucket rows are
+    locked until commit (FOR UPDATE; SQLite already holds the write lock), so
+    two concurrent withdrawals cannot both move the same money. Returns the
+    amount moved.
+    """
+    result = await db.execute(
+        select(BalanceBucket.bucket, BalanceBucket.balance)
+        .where(BalanceBucket.account_id == account_id)
+        .where(BalanceBucket.balance != 0)
+        .with_for_update()
+    )
+    rows = result.all()
+    if not rows:
+        return 0.0
+
+    conn = await db.connection()
+    await conn.execute(
+        update(buckets_table)
+        .where(buckets_table.c.account_id == bindparam("b_account_id"))
+        .where(buckets_table.c.bucket == bindparam("b_bucket"))
+        .values(balance=buckets_table.c.balance - bindparam("b_amount")),
+        [{"b_account_id": account_id, "b_bucket": bucket, "b_amount": balance} for bucket, balance in rows]
+    )
+    total = sum(balance for _, balance in rows)
+    await conn.execute(
+        update(Account.__table__)
+        .where(Account.id == account_id)
+        .values(balance=Account.balance + total, version=Account.version + 1)
+    )
+    return total
+
+
+async def effective_balance(db: AsyncSession, account_id: int) -> float:
+    """Current balance of an account, buckets included"""
+    result = await db.execute(select(EFFECTIVE_BALANCE).where(Account.id == account_id))
+    return result.scalar_one()
+
+
+async def set_balance_buckets(db: AsyncSession, account_id: int, buckets: int) -> None:
+    """Change the number of buckets of an account, folding existing buckets into the account row"""
+    # services.cache imports this module (through services.serialization)
+    from services.cache import ACCOUNT, record_change
+    await sweep_buckets(db, account_id)
+    await db.execute(
+        update(Account)
+        .where(Account.id == account_id)
+        .values(balance_buckets=buckets, version=Account.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+    await record_change(db, ACCOUNT, account_id)
+    await db.commit()
+
+
+async def _main(account_id: int, buckets: int) -> None:
+    async with AsyncSessionLocal() as db:
+        await set_balance_buckets(db, account_id, buckets)
+        print(f"account {account_id}: {buckets} balance buckets, balance {await effective_balance(db, account_id)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enable or disable bucketed balances for a hot account")
+    parser.add_argument("account_id", type=int)
+    parser.add_argument("--buckets", type=int, required=True, help="number of buckets, 0 to disable")
+    args = parser.parse_args()
+    asyncio.run(_main(args.account_id, args.buckets))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""
+Per-worker caches invalidated through the database.
+
+With several uvicorn workers an in-process cache goes stale as soon as
+another worker changes the data. Writers call record_change() inside the
+transaction of the change, which adds a row to the change_log table; every
+worker runs a ChangeFeed (started from the app lifespan) that polls the
+rows past the last id it has seen and drops the matching cache entries.
+
+* the committing worker invalidates right after its commit;
+* other workers within `change_poll_seconds`;
+* entries also expire after `cache_ttl_seconds`, as a safety net.
+
+A read that started before a change must not put its (stale) result back
+after the invalidation: every invalidation bumps a generation counter, each
+session records the generation when its transaction begins (its snapshot
+is at least that recent), and set() refuses values whose key was
+invalidated after the generation they were read at.
+
+No broker is needed: the database already shared by the workers is the channel.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Optional
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.database import ChangeLog, WriterSession, engine
+from services.serialization import fetch_account_row
+
+logger = logging.getLogger("uvicorn.error")
+
+# Entities recorded in the change log
+USER = "user"
+ACCOUNT = "account"
+
+# Ids re-read on every poll (changes already applied are skipped): on Postgres
+# ids are assigned before commit, so a transaction can become visible after a
+# higher id has already been seen
+CHANGE_LOG_LOOKBACK = 100
+PRUNE_EVERY_POLLS = 1000
+
+# Bumped by every invalidation, in all caches
+_generation = 0
+
+
+def _next_generation() -> int:
+    global _generation
+    _generation += 1
+    return _generation
+
+
+class LocalCache:
+    """Bounded in-process mapping with a TTL"""
+
+    def __init__(self, key_type: Callable[[str], Any] = str):
+        # Converts change_log keys (strings) to cache keys
+        self.key_type = key_type
+        self._entries: dict = {}
+        # key -> generation of its last invalidation (bounded like the entries)
+        self._invalidated: dict = {}
+        # Values read before this generation are refused (older invalidations are forgotten)
+        self._floor = 0
+
+    def get(self, key) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if time.monotonic() > expires_at:
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, generation: int) -> None:
+        """Store a value read at `generation` (see session_generation()), unless it was invalidated since"""
+        if not settings.cache_enabled:
+            return
+        if generation < self._floor or self._invalidated.get(key, 0) > generation:
+            return
+        if len(self._entries) >= settings.cache_max_entries:
+            # Dicts keep insertion order: drop the oldest entry
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (value, time.monotonic() + settings.cache_ttl_seconds)
+
+    def invalidate(self, key) -> None:
+        self._entries.pop(key, None)
+        self._invalidated.pop(key, None)
+        if len(self._invalidated) >= settings.cache_max_entries:
+            self._floor = self._invalidated.pop(next(iter(self._invalidated)))
+        self._invalidated[key] = _next_generation()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._invalidated.clear()
+        self._floor = _next_generation()
+
+
+# username -> detached User, read by get_current_user
+user_cache = LocalCache()
+# account id -> AccountResponse fields plus version
+account_cache = LocalCache(int)
+
+CACHES: dict[str, LocalCache] = {
+    USER: user_cache,
+    ACCOUNT: account_cache,
+}
+
+
+def invalidate(entity: str, key: str) -> None:
+    cache = CACHES.get(entity)
+    if cache is not None:
+        cache.invalidate(cache.key_type(key))
+
+
+def clear_caches() -> None:
+    for cache in CACHES.values():
+        cache.clear()
+
+
+async def record_change(db: AsyncSession, entity: str, key) -> None:
+    """Record a change in the session's transaction; local entries are dropped on commit"""
+    await db.execute(insert(ChangeLog).values(entity=entity, key=str(key)))
+    db.info.setdefault("changes", []).append((entity, str(key)))
+
+
+@event.listens_for(WriterSession, "after_commit")
+def _invalidate_committed(session):
+    for entity, key in session.info.pop("changes", ()):
+        invalidate(entity, key)
+
+
+@event.listens_for(WriterSession, "after_rollback")
+def _forget_rolled_back(session):
+    session.info.pop("changes", None)
+
+
+@event.listens_for(Session, "after_begin")
+def _remember_generation(session, transaction, connection):
+    # Everything this transaction reads is at least as recent as this generation
+    session.info["cache_generation"] = _generation
+
+
+def session_generation(db: AsyncSession) -> int:
+    """Generation to pass to LocalCache.set() for values read in the session's current transaction"""
+    return db.info.get("cache_generation", _generation)
+
+
+async def cached_account_row(db: AsyncSession, account_id: int) -> Optional[dict]:
+    """fetch_account_row through the account cache; returns a copy the caller may modify"""
+    row = account_cache.get(account_id)
+    if row is None:
+        row = await fetch_account_row(db, account_id)
+        if row is None:
+            return None
+        account_cache.set(account_id, row, session_generation(db))
+    return dict(row)
+
+
+class ChangeFeed:
+    """Polls change_log and invalidates the local caches"""
+
+    def __init__(self, poll_seconds: float = settings.change_poll_seconds):
+        self._poll_seconds = poll_seconds
+        self._last_id = 0
+        # Ids applied within the lookback window
+        self._seen: set[int] = set()
+        self._last_poll = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if not settings.cache_enabled:
+            return
+        async with engine.connect() as conn:
+            self._last_id = (await conn.execute(select(func.coalesce(func.max(ChangeLog.id), 0)))).scalar()
+        self._last_poll = time.monotonic()
+        self._task = asyncio.create_task(self._poll_loop(), name="change-feed")
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def poll(self) -> int:
+        """Apply the changes recorded since the last poll; returns how many were read"""
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                select(ChangeLog.id, ChangeLog.entity, ChangeLog.key)
+                .where(ChangeLog.id > self._last_id - CHANGE_LOG_LOOKBACK)
+                .order_by(ChangeLog.id)
+            )
+            rows = result.all()
+        now = time.monotonic()
+        if now - self._last_poll > settings.change_log_retention_seconds:
+            # Rows may have been pruned before this worker saw them
+            clear_caches()
+        self._last_poll = now
+        fresh = [row for row in rows if row.id not in self._seen]
+        for _, entity, key in fresh:
+            invalidate(entity, key)
+        if rows:
+            self._last_id = max(self._last_id, rows[-1].id)
+        self._seen = {row.id for row in rows if row.id > self._last_id - CHANGE_LOG_LOOKBACK}
+        return len(fresh)
+
+    async def prune(self) -> None:
+        """Delete change log rows older than the retention period"""
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.change_log_retention_seconds)
+        async with engine.begin() as conn:
+            await conn.execute(delete(ChangeLog).where(ChangeLog.created_at < cutoff))
+
+    async def _poll_loop(self) -> None:
+        polls = 0
+        while True:
+            await asyncio.sleep(self._poll_seconds)
+            try:
+                await self.poll()
+                polls += 1
+                if polls % PRUNE_EVERY_POLLS == 0:
+                    await self.prune()
+            except Exception:
+                logger.exception("Change log poll failed, clearing local caches")
+                clear_caches()
+
+
+change_feed = ChangeFeed()
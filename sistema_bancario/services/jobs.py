@@ -0,0 +1,231 @@
+"""
+Local background job queue.
+
+Jobs live in the `jobs` table, so they survive restarts and are visible to
+every worker process; each process runs a few asyncio workers (JobRunner,
+started from the app lifespan) that claim pending jobs with an atomic UPDATE
+and run the builder registered for the job kind.
+
+Statement files are cached per account version: asking again for a statement
+of an unchanged account returns the existing job instead of queueing a new one.
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import orjson
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models.database import Account, Job, JobStatus, engine, read_engine
+from models.schemas import JobResponse
+from services.archive import ledger_statement
+from services.balances import EFFECTIVE_VERSION
+from services.serialization import ACCOUNT_COLUMNS
+
+logger = logging.getLogger("uvicorn.error")
+
+STATEMENT_JOB = "statement"
+STREAM_PARTITION_SIZE = 1000
+
+
+async def build_statement(job_id: int, account_id: int) -> tuple[str, int]:
+    """
+    Write the statement of an account to a JSON file, streaming the transactions.
+
+    Produces the same document as GET /statements/account/{id} (archived
+    transactions included). Returns the
+    file path and the account version it reflects.
+    """
+    directory = Path(settings.job_artifact_dir)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    async with read_engine.connect() as conn:
+        row = (await conn.execute(
+            select(*ACCOUNT_COLUMNS, EFFECTIVE_VERSION).where(Account.id == account_id)
+        )).mappings().one()
+        account = dict(row)
+        version = account.pop("version")
+        path = directory / f"statement-{account_id}-v{version}-{job_id}.json"
+
+        result = await conn.stream(*await ledger_statement(conn, account_id))
+        keys = tuple(result.keys())
+        total = 0
+        with open(path, "wb") as f:
+            await asyncio.to_thread(f.write, b'{"account":' + orjson.dumps(account) + b',"transactions":[')
+            async for partition in result.partitions(STREAM_PARTITION_SIZE):
+                chunk = b",".join(orjson.dumps(dict(zip(keys, row))) for row in partition)
+                await asyncio.to_thread(f.write, (b"," if total else b"") + chunk)
+                total += len(partition)
+            await asyncio.to_thread(f.write, b'],"total_transactions":' + str(total).encode() + b"}")
+    return str(path), version
+
+
+# kind -> coroutine(job_id, account_id) returning (artifact path, account version)
+JOB_BUILDERS: dict[str, Callable[[int, int], Awaitable[tuple[str, int]]]] = {
+    STATEMENT_JOB: build_statement,
+}
+
+
+async def enqueue_job(db: AsyncSession, user_id: int, account_id: int, kind: str, account_version: int) -> Job:
+    """
+    Queue a job, reusing a queued, running or finished one for the same account version.
+
+    Commits the new job and wakes up the local runner.
+    """
+    result = await db.execute(
+        select(Job)
+        .where(Job.account_id == account_id)
+        .where(Job.kind == kind)
+        .where(Job.account_version == account_version)
+        .where(Job.status.in_([JobStatus.PENDING, JobStatus.RUNNING, JobStatus.DONE]))
+        .order_by(Job.id.desc())
+        .limit(1)
+    )
+    job = result.scalar_one_or_none()
+    if job:
+        return job
+
+    job = Job(user_id=user_id, account_id=account_id, kind=kind, account_version=account_version)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    job_runner.notify()
+    return job
+
+
+async def get_job(db: AsyncSession, job_id: int) -> Optional[Job]:
+    result = await db.execute(select(Job).where(Job.id == job_id))
+    return result.scalar_one_or_none()
+
+
+def job_response(job: Job) -> JobResponse:
+    """JobResponse with the download link of finished jobs"""
+    response = JobResponse.model_validate(job)
+    if job.status == JobStatus.DONE:
+        response.download_url = f"/jobs/{job.id}/download"
+    return response
+
+
+class JobRunner:
+    """In-process asyncio workers draining the jobs table"""
+
+    def __init__(self, workers: int = settings.job_workers, poll_seconds: float = settings.job_poll_seconds):
+        self._workers = workers
+        self._poll_seconds = poll_seconds
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def notify(self) -> None:
+        """Wake the workers up without waiting for the next poll"""
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        await self._requeue_stale()
+        self._tasks = [asyncio.create_task(self._work(), name=f"job-worker-{i}") for i in range(self._workers)]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _requeue_stale(self) -> None:
+        """Return jobs stuck in RUNNING (their worker died) to the queue"""
+        stale_before = datetime.utcnow() - timedelta(seconds=settings.job_stale_seconds)
+        async with engine.begin() as conn:
+            await conn.execute(
+                update(Job)
+                .where(Job.status == JobStatus.RUNNING)
+                .where(Job.started_at < stale_before)
+                .values(status=JobStatus.PENDING, started_at=None)
+            )
+
+    async def _claim(self) -> Optional[tuple[int, int, str]]:
+        """Atomically move the oldest pending job to RUNNING"""
+        next_job = (
+            select(Job.id)
+            .where(Job.status == JobStatus.PENDING)
+            .order_by(Job.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                update(Job)
+                .where(Job.id == next_job)
+                .where(Job.status == JobStatus.PENDING)
+                .values(status=JobStatus.RUNNING, started_at=datetime.utcnow())
+                .returning(Job.id, Job.account_id, Job.kind)
+            )
+            return result.first()
+
+    async def _finish(self, job_id: int, **values) -> None:
+        async with engine.begin() as conn:
+            await conn.execute(
+                update(Job).where(Job.id == job_id).values(finished_at=datetime.utcnow(), **values)
+            )
+
+    async def _expire_older(self, job_id: int, account_id: int, kind: str) -> None:
+        """Delete the artifacts of older finished jobs of the same account and kind"""
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                select(Job.id, Job.artifact_path)
+                .where(Job.account_id == account_id)
+                .where(Job.kind == kind)
+                .where(Job.status == JobStatus.DONE)
+                .where(Job.id < job_id)
+            )
+            expired = result.all()
+            if not expired:
+                return
+            await conn.execute(
+                update(Job)
+                .where(Job.id.in_([row.id for row in expired]))
+                .values(status=JobStatus.EXPIRED, artifact_path=None)
+            )
+        for _, path in expired:
+            if path and os.path.exists(path):
+                os.remove(path)
+
+    async def _run(self, job_id: int, account_id: int, kind: str) -> None:
+        try:
+            path, version = await JOB_BUILDERS[kind](job_id, account_id)
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job_id, kind)
+            await self._finish(job_id, status=JobStatus.FAILED, error=str(e))
+            return
+        await self._finish(job_id, status=JobStatus.DONE, artifact_path=path, account_version=version)
+        try:
+            await self._expire_older(job_id, account_id, kind)
+        except Exception:
+            # The job is done; the older artifacts go with the next statement of the account
+            logger.exception("Could not expire the jobs older than %s", job_id)
+
+    async def _wait(self) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self._poll_seconds)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _work(self) -> None:
+        while True:
+            try:
+                claimed = await self._claim()
+                if claimed:
+                    await self._run(*claimed)
+                    continue
+            except Exception:
+                # Transient database errors ("database is locked"...) must not kill the worker;
+                # a job whose status write failed stays RUNNING until _requeue_stale()
+                logger.exception("Job worker error, retrying in %ss", self._poll_seconds)
+                await asyncio.sleep(self._poll_seconds)
+                continue
+            await self._wait()
+
+job_runner = JobRunner()
@@ -0,0 +1,196 @@
+"""
+Event-loop lag monitor and sampling profiler.
+
+LoopMonitor runs a heartbeat task on the event loop and a watchdog thread
+beside it. The heartbeat measures lag (how late each tick wakes up); the
+watchdog notices when the loop has not ticked for `slow_callback_ms` and
+samples the loop thread's stack while it is blocked, so the synchronous
+section responsible (bcrypt, JSON encoding, a SQLite call...) shows up with
+the handler that ran it.
+
+SamplingProfiler is opt-in (see the /admin/profiler endpoints): a thread
+samples the loop thread's stack at a fixed interval and writes the samples
+in collapsed-stack format ("frame;frame;frame count" lines), readable by
+flamegraph.pl, speedscope or inferno.
+
+Both observe the worker process they run in.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+MAX_STACK_SAMPLES = 5
+
+
+def _stack(frame) -> list[str]:
+    """Frames from the outermost to `frame`, as file:function labels"""
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+class LoopMonitor:
+    """Heartbeat task measuring event-loop lag plus a watchdog thread sampling blocked stacks"""
+
+    def __init__(
+        self,
+        interval: float = settings.loop_monitor_interval_seconds,
+        threshold_ms: float = settings.slow_callback_ms
+    ):
+        self.interval = interval
+        self.threshold_ms = threshold_ms
+        # Lag of the recent heartbeats, in ms
+        self.lags: deque[float] = deque(maxlen=600)
+        self.max_lag_ms = 0.0
+        # Recent stalls: started_at, duration_ms, stack samples
+        self.slow_sections: deque[dict] = deque(maxlen=50)
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    async def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name="loop-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._watchdog:
+            await asyncio.to_thread(self._watchdog.join)
+            self._watchdog = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag_ms = max(0.0, (now - expected) * 1000)
+            self.lags.append(lag_ms)
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            self._beat = now
+
+    def _watch(self) -> None:
+        """Watchdog thread: sample the loop thread's stack while it is blocked"""
+        threshold = self.threshold_ms / 1000
+        stall: Optional[dict] = None
+        while not self._stopped.wait(min(self.interval, threshold) / 2):
+            beat = self._beat
+            if stall is not None and stall["beat"] != beat:
+                # The loop ticked again: the stall is over
+                logger.warning(
+                    "Event loop blocked for %.0f ms in:\n  %s",
+                    stall["duration_ms"], "\n  ".join(stall["stacks"]) or "(no sample)"
+                )
+                stall = None
+            blocked = time.monotonic() - (beat + self.interval)
+            if blocked > threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if stall is None:
+                    stall = {"beat": beat, "started_at": datetime.utcnow() - timedelta(seconds=blocked), "duration_ms": 0.0, "stacks": []}
+                    self.slow_sections.append(stall)
+                stall["duration_ms"] = blocked * 1000
+                if frame is not None and len(stall["stacks"]) < MAX_STACK_SAMPLES:
+                    stack = ";".join(_stack(frame))
+                    if stack not in stall["stacks"]:
+                        stall["stacks"].append(stack)
+
+    def stats(self) -> dict:
+        lags = sorted(self.lags)
+
+        def percentile(p: float) -> float:
+            return lags[min(len(lags) - 1, int(len(lags) * p))] if lags else 0.0
+
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold_ms,
+            "lag_p50_ms": percentile(0.50),
+            "lag_p99_ms": percentile(0.99),
+            "lag_max_ms": self.max_lag_ms,
+            "slow_sections": [
+                {key: value for key, value in stall.items() if key != "beat"}
+                for stall in self.slow_sections
+            ],
+        }
+
+
+class SamplingProfiler:
+    """Samples the loop thread's stack from a background thread, writing collapsed stacks"""
+
+    def __init__(self):
+        self.samples: Counter = Counter()
+        # Running total of samples, readable while the sampling thread updates `samples`
+        self.sample_count = 0
+        self.interval_ms = settings.profile_interval_ms
+        self.started_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self, interval_ms: Optional[float] = None) -> None:
+        if self.running:
+            return
+        self.interval_ms = interval_ms or settings.profile_interval_ms
+        self.samples = Counter()
+        self.sample_count = 0
+        self.started_at = time.time()
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def _sample(self) -> None:
+        interval = self.interval_ms / 1000
+        while not self._stopped.wait(interval):
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is not None:
+                self.samples[";".join(_stack(frame))] += 1
+                self.sample_count += 1
+
+    def stop(self) -> Optional[str]:
+        """Stop sampling and write the collapsed stacks; returns the file path"""
+        if not self.running:
+            return None
+        self._stopped.set()
+        self._thread.join()
+        # The sampling thread is gone; keep this run's samples in case start() is called meanwhile
+        samples, started_at = self.samples, self.started_at
+        self._thread = None
+        directory = Path(settings.profile_dir)
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"profile-{time.strftime('%Y%m%d-%H%M%S', time.localtime(started_at))}-{os.getpid()}.folded"
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return str(path)
+
+
+loop_monitor = LoopMonitor()
+profiler = SamplingProfiler()
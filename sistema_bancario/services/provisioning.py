@@ -0,0 +1,232 @@
+"""
+Bulk user and account import.
+
+Provisions users (and optionally one account each) from a CSV or NDJSON file
+with the fields username, email, password and account_number (optional):
+
+* the file is streamed and processed in batches;
+* rows are validated with the API schemas, and duplicates within the file or
+  against the database (one query per batch and field) are rejected before
+  any hashing;
+* passwords are hashed in parallel on a process pool;
+* users and accounts are inserted with one executemany per batch and table,
+  users with RETURNING to get their ids.
+
+Rejected rows are written to an NDJSON report with their line number and
+reason (never the password).
+
+Usage (from the sistema_bancario directory):
+
+    python -m services.provisioning users.csv --rejects rejects.ndjson
+    python -m services.provisioning users.ndjson --batch-size 2000 --processes 8
+"""
+import argparse
+import asyncio
+import csv
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from typing import Iterator, Optional, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from models.database import Account, AsyncSessionLocal, User, engine, init_db
+from models.schemas import AccountCreate, UserCreate
+from services.auth import get_password_hash
+
+IMPORT_BATCH_SIZE = 1000
+
+
+@dataclass
+class ImportRow:
+    line: int
+    username: str
+    email: str
+    password: str
+    account_number: Optional[str]
+    hashed_password: Optional[str] = None
+
+
+@dataclass
+class ImportReport:
+    users: int = 0
+    accounts: int = 0
+    rejected: int = 0
+    rejects: list[dict] = field(default_factory=list)
+
+    def reject(self, line: int, username, reason: str) -> None:
+        self.rejected += 1
+        self.rejects.append({"line": line, "username": username, "reason": reason})
+
+
+def read_rows(f: TextIO, fmt: str) -> Iterator[tuple[int, dict]]:
+    """Yield (line number, fields) from a CSV (with header) or NDJSON file"""
+    if fmt == "csv":
+        reader = csv.DictReader(f)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line, text in enumerate(f, start=1):
+        if text.strip():
+            try:
+                yield line, json.loads(text)
+            except ValueError:
+                yield line, None
+
+
+def validate(line: int, record: Optional[dict], report: ImportReport) -> Optional[ImportRow]:
+    """Check a record against the registration and account schemas"""
+    if not isinstance(record, dict):
+        report.reject(line, None, "malformed record")
+        return None
+    account_number = record.get("account_number") or None
+    try:
+        user = UserCreate(username=record.get("username"), email=record.get("email"), password=record.get("password"))
+        if account_number is not None:
+            AccountCreate(account_number=account_number)
+    except ValidationError as e:
+        error = e.errors()[0]
+        report.reject(line, record.get("username"), f"{'.'.join(map(str, error['loc']))}: {error['msg']}")
+        return None
+    if len(user.password.encode("utf-8")) > 72:
+        report.reject(line, user.username, "password cannot exceed 72 bytes")
+        return None
+    return ImportRow(line, user.username, user.email, user.password, account_number)
+
+
+class Importer:
+    """Imports batches of rows, tracking the keys already taken by earlier rows of the file"""
+
+    def __init__(self, pool: ProcessPoolExecutor, report: ImportReport):
+        self.pool = pool
+        self.report = report
+        self.usernames: set[str] = set()
+        self.emails: set[str] = set()
+        self.account_numbers: set[str] = set()
+
+    async def _existing(self, db, column, values: list[str]) -> set[str]:
+        if not values:
+            return set()
+        result = await db.execute(select(column).where(column.in_(values)))
+        return set(result.scalars())
+
+    async def _filter_duplicates(self, db, rows: list[ImportRow]) -> list[ImportRow]:
+        """Reject rows whose username, email or account number is taken, in the file or in the database"""
+        taken_usernames = self.usernames | await self._existing(db, User.username, [r.username for r in rows])
+        taken_emails = self.emails | await self._existing(db, User.email, [r.email for r in rows])
+        taken_accounts = self.account_numbers | await self._existing(
+            db, Account.account_number, [r.account_number for r in rows if r.account_number]
+        )
+        accepted = []
+        for row in rows:
+            if row.username in taken_usernames:
+                self.report.reject(row.line, row.username, "username already registered")
+            elif row.email in taken_emails:
+                self.report.reject(row.line, row.username, "email already registered")
+            elif row.account_number and row.account_number in taken_accounts:
+                self.report.reject(row.line, row.username, "account number already exists")
+            else:
+                accepted.append(row)
+            taken_usernames.add(row.username)
+            taken_emails.add(row.email)
+            if row.account_number:
+                taken_accounts.add(row.account_number)
+        self.usernames.update(r.username for r in rows)
+        self.emails.update(r.email for r in rows)
+        self.account_numbers.update(r.account_number for r in rows if r.account_number)
+        return accepted
+
+    async def _insert(self, db, rows: list[ImportRow]) -> None:
+        result = await db.execute(
+            insert(User).returning(User.id, User.username),
+            [{"username": r.username, "email": r.email, "hashed_password": r.hashed_password} for r in rows]
+        )
+        user_ids = {username: user_id for user_id, username in result}
+        accounts = [
+            {"user_id": user_ids[r.username], "account_number": r.account_number, "balance": 0.0}
+            for r in rows if r.account_number
+        ]
+        if accounts:
+            await db.execute(insert(Account), accounts)
+        self.report.users += len(rows)
+        self.report.accounts += len(accounts)
+
+    async def import_batch(self, rows: list[ImportRow]) -> None:
+        async with AsyncSessionLocal() as db:
+            rows = await self._filter_duplicates(db, rows)
+            if not rows:
+                return
+            loop = asyncio.get_running_loop()
+            hashes = await asyncio.gather(*(loop.run_in_executor(self.pool, get_password_hash, r.password) for r in rows))
+            for row, hashed in zip(rows, hashes):
+                row.hashed_password = hashed
+
+            try:
+                await self._insert(db, rows)
+                await db.commit()
+                return
+            except IntegrityError:
+                # Registered concurrently through the API: insert one by one to isolate the conflicts
+                await db.rollback()
+            for row in rows:
+                try:
+                    await self._insert(db, [row])
+                    await db.commit()
+                except IntegrityError:
+                    await db.rollback()
+                    self.report.reject(row.line, row.username, "conflicts with a concurrent registration")
+
+
+async def import_file(path: str, fmt: str, batch_size: int, processes: int) -> ImportReport:
+    report = ImportReport()
+    # Not forked: this process already runs an event loop and aiosqlite threads holding connections
+    pool = ProcessPoolExecutor(processes, mp_context=multiprocessing.get_context("forkserver"))
+    with open(path, newline="", encoding="utf-8") as f, pool:
+        importer = Importer(pool, report)
+        records = read_rows(f, fmt)
+        while chunk := list(islice(records, batch_size)):
+            rows = [row for line, record in chunk if (row := validate(line, record, report))]
+            if rows:
+                await importer.import_batch(rows)
+    return report
+
+
+async def _main(args) -> None:
+    await init_db()
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    started = time.perf_counter()
+    report = await import_file(args.path, fmt, args.batch_size, args.processes)
+    elapsed = time.perf_counter() - started
+
+    total = report.users + report.rejected
+    print(f"{report.users} users and {report.accounts} accounts created, {report.rejected} rows rejected "
+          f"in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s)")
+    if args.rejects:
+        with open(args.rejects, "w", encoding="utf-8") as f:
+            for reject in report.rejects:
+                f.write(json.dumps(reject) + "\n")
+    else:
+        for reject in report.rejects[:10]:
+            print(f"  line {reject['line']}: {reject['reason']}")
+    await engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import users and accounts from CSV or NDJSON")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="password hashing processes")
+    parser.add_argument("--rejects", help="write rejected rows to this NDJSON file")
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+In-process rate limiting and admission control.
+
+* RateLimiter: token buckets keyed by client IP or user id;
+* ConcurrencyLimiter: caps the requests in flight on an expensive route.
+
+Both reject immediately with a cheap 429 + Retry-After instead of queueing,
+so one client cannot build up latency for everybody else. State is per
+process: with N workers the effective limits are N times the settings.
+"""
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import Depends, HTTPException, Request, status
+
+from config import settings
+from models.database import User
+from services.auth import get_current_user
+
+
+class RateLimiter:
+    """Token buckets of `burst` tokens refilled at `rate` tokens per second, one per key"""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # key -> (tokens, last refill time); least recently used first
+        self._buckets: OrderedDict = OrderedDict()
+
+    def acquire(self, key) -> float:
+        """Take a token for `key`: returns 0 when allowed, else the seconds until one is available"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            wait = 0.0
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            # Evicting the idle key only forgets a (nearly) full bucket
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimiter:
+    """Non-blocking cap on concurrent executions"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+
+    def acquire(self) -> bool:
+        if self.in_flight >= self.limit:
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+
+def too_many_requests(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Too many requests",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def limit_by_ip(limiter: RateLimiter):
+    """Dependency applying `limiter` per client address"""
+    async def dependency(request: Request) -> None:
+        wait = limiter.acquire(client_ip(request))
+        if wait:
+            raise too_many_requests(wait)
+    return dependency
+
+
+def limit_by_user(limiter: RateLimiter):
+    """Dependency applying `limiter` per authenticated user"""
+    async def dependency(current_user: User = Depends(get_current_user)) -> None:
+        wait = limiter.acquire(current_user.id)
+        if wait:
+            raise too_many_requests(wait)
+    return dependency
+
+
+def limit_concurrency(limiter: ConcurrencyLimiter):
+    """Dependency holding a slot of `limiter` for the duration of the request"""
+    async def dependency():
+        if not limiter.acquire():
+            raise too_many_requests(1)
+        try:
+            yield
+        finally:
+            limiter.release()
+    return dependency
+
+
+# Limiters of the API routes
+login_limiter = RateLimiter(settings.login_rate_per_second, settings.login_burst)
+login_concurrency = ConcurrencyLimiter(settings.login_concurrency)
+register_limiter = RateLimiter(settings.register_rate_per_second, settings.register_burst)
+transaction_limiter = RateLimiter(settings.transaction_rate_per_second, settings.transaction_burst)
+transaction_concurrency = ConcurrencyLimiter(settings.transaction_concurrency)
+statement_concurrency = ConcurrencyLimiter(settings.statement_concurrency)
@@ -0,0 +1,224 @@
+"""
+Balance reconciliation.
+
+Recomputes every account's balance from its ledger and compares it with the
+stored one. The expected balance is the account's ledger_snapshots balance
+(its archived transactions) plus the signed sum of its live transactions;
+the actual balance is accounts.balance plus its balance buckets.
+
+Accounts are processed in chunks of consecutive ids, one query per chunk:
+the database aggregates the chunk's slice of the (account_id, created_at)
+index with a GROUP BY and returns one row per account, so memory is bounded
+by the chunk size whatever the size of the ledger. Each query reads a
+consistent snapshot, and a transaction row is always committed together
+with its balance update, so live traffic does not cause false mismatches.
+The id space can be split across processes (--processes) or machines
+(--range).
+
+With --repair, each mismatched account is checked again and corrected in its
+own transaction: the difference is added to accounts.balance (buckets are
+left alone) and its version bumped, unless its balance moved in between.
+
+Usage (from the sistema_bancario directory):
+
+    python -m services.reconcile
+    python -m services.reconcile --processes 8 --report mismatches.ndjson
+    python -m services.reconcile --range 1-5000000 --repair
+
+Exits with status 1 when mismatches remain.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Optional
+
+from sqlalchemy import bindparam, func, select, update
+
+from models.database import Account, AsyncSessionLocal, LedgerSnapshot, Transaction, engine, read_engine
+from services.archive import SIGNED_AMOUNT
+from services.balances import EFFECTIVE_BALANCE, EFFECTIVE_VERSION
+from services.cache import ACCOUNT, record_change
+
+RECONCILE_CHUNK_SIZE = 10_000
+# Float sums may differ in the last digits depending on the summation order
+RECONCILE_TOLERANCE = 0.005
+
+
+def _chunk_query():
+    live = (
+        select(
+            Transaction.account_id,
+            func.sum(SIGNED_AMOUNT).label("total"),
+            func.count().label("transactions")
+        )
+        .where(Transaction.account_id.between(bindparam("lo"), bindparam("hi")))
+        .group_by(Transaction.account_id)
+        .subquery()
+    )
+    return (
+        select(
+            Account.id,
+            EFFECTIVE_BALANCE,
+            EFFECTIVE_VERSION,
+            (func.coalesce(LedgerSnapshot.balance, 0.0) + func.coalesce(live.c.total, 0.0)).label("expected"),
+            (func.coalesce(LedgerSnapshot.transactions, 0) + func.coalesce(live.c.transactions, 0)).label("transactions"),
+        )
+        .outerjoin(live, live.c.account_id == Account.id)
+        .outerjoin(LedgerSnapshot, LedgerSnapshot.account_id == Account.id)
+        .where(Account.id.between(bindparam("lo"), bindparam("hi")))
+        .order_by(Account.id)
+    )
+
+
+# Stored and expected balance of the accounts with ids in [lo, hi]
+RECONCILE_CHUNK = _chunk_query()
+
+
+@dataclass
+class ReconcileReport:
+    accounts: int = 0
+    transactions: int = 0
+    repaired: int = 0
+    mismatches: list[dict] = field(default_factory=list)
+
+    def merge(self, other: "ReconcileReport") -> None:
+        self.accounts += other.accounts
+        self.transactions += other.transactions
+        self.repaired += other.repaired
+        self.mismatches.extend(other.mismatches)
+
+
+async def repair_account(account_id: int, tolerance: float = RECONCILE_TOLERANCE) -> bool:
+    """Set an account's balance to its ledger total; False when it matches or changed meanwhile"""
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(RECONCILE_CHUNK, {"lo": account_id, "hi": account_id})).one_or_none()
+        if row is None or abs(row.expected - row.balance) <= tolerance:
+            return False
+        # A concurrent deposit or withdrawal bumps the version: leave the account to the next run
+        result = await db.execute(
+            update(Account)
+            .where(Account.id == account_id)
+            .where(EFFECTIVE_VERSION.element == row.version)
+            .values(balance=Account.balance + (row.expected - row.balance), version=Account.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            await db.rollback()
+            return False
+        await record_change(db, ACCOUNT, account_id)
+        await db.commit()
+        return True
+
+
+async def reconcile_range(
+    lo: int,
+    hi: int,
+    chunk_size: int = RECONCILE_CHUNK_SIZE,
+    tolerance: float = RECONCILE_TOLERANCE,
+    repair: bool = False
+) -> ReconcileReport:
+    """Check (and optionally repair) the accounts with ids in [lo, hi]"""
+    report = ReconcileReport()
+    for start in range(lo, hi + 1, chunk_size):
+        async with read_engine.connect() as conn:
+            rows = (await conn.execute(RECONCILE_CHUNK, {"lo": start, "hi": min(start + chunk_size - 1, hi)})).all()
+        for row in rows:
+            report.accounts += 1
+            report.transactions += row.transactions
+            if abs(row.expected - row.balance) <= tolerance:
+                continue
+            repaired = repair and await repair_account(row.id, tolerance)
+            report.repaired += repaired
+            report.mismatches.append({
+                "account_id": row.id,
+                "balance": row.balance,
+                "expected": row.expected,
+                "difference": row.balance - row.expected,
+                "repaired": repaired,
+            })
+    return report
+
+
+async def _id_bounds() -> tuple[Optional[int], Optional[int]]:
+    async with read_engine.connect() as conn:
+        bounds = (await conn.execute(select(func.min(Account.id), func.max(Account.id)))).one()
+    await read_engine.dispose()
+    return tuple(bounds)
+
+
+async def _run_range(bounds: tuple[int, int], chunk_size: int, tolerance: float, repair: bool) -> ReconcileReport:
+    try:
+        return await reconcile_range(*bounds, chunk_size, tolerance, repair)
+    finally:
+        await read_engine.dispose()
+        await engine.dispose()
+
+
+def _reconcile_worker(bounds: tuple[int, int], chunk_size: int, tolerance: float, repair: bool) -> ReconcileReport:
+    """Entry point of a worker process"""
+    return asyncio.run(_run_range(bounds, chunk_size, tolerance, repair))
+
+
+def split_range(lo: int, hi: int, parts: int) -> list[tuple[int, int]]:
+    """Split [lo, hi] into at most `parts` contiguous ranges"""
+    size = -(-(hi - lo + 1) // parts)
+    return [(start, min(start + size - 1, hi)) for start in range(lo, hi + 1, size)]
+
+
+def _parse_range(value: str) -> tuple[int, int]:
+    try:
+        lo, hi = (int(bound) for bound in value.split("-"))
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected "LO-HI"')
+    if lo > hi:
+        raise argparse.ArgumentTypeError("LO must not exceed HI")
+    return lo, hi
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check account balances against their ledger")
+    parser.add_argument("--range", type=_parse_range, help='only the account ids in "LO-HI" (inclusive)')
+    parser.add_argument("--processes", type=int, default=1, help="split the id range across processes")
+    parser.add_argument("--chunk-size", type=int, default=RECONCILE_CHUNK_SIZE, help="accounts per query")
+    parser.add_argument("--tolerance", type=float, default=RECONCILE_TOLERANCE)
+    parser.add_argument("--repair", action="store_true", help="correct mismatched balances")
+    parser.add_argument("--report", help="write the mismatches to this NDJSON file")
+    args = parser.parse_args()
+
+    lo, hi = args.range or asyncio.run(_id_bounds())
+    if lo is None:
+        print("no accounts")
+        return
+    started = time.perf_counter()
+    ranges = split_range(lo, hi, max(1, args.processes))
+    worker = partial(_reconcile_worker, chunk_size=args.chunk_size, tolerance=args.tolerance, repair=args.repair)
+    report = ReconcileReport()
+    if len(ranges) == 1:
+        report.merge(worker(ranges[0]))
+    else:
+        with ProcessPoolExecutor(len(ranges)) as pool:
+            for partial_report in pool.map(worker, ranges):
+                report.merge(partial_report)
+    elapsed = time.perf_counter() - started
+
+    print(f"{report.accounts} accounts and {report.transactions} transactions checked in {elapsed:.1f}s, "
+          f"{len(report.mismatches)} mismatches, {report.repaired} repaired")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            for mismatch in report.mismatches:
+                f.write(json.dumps(mismatch) + "\n")
+    else:
+        for mismatch in report.mismatches[:10]:
+            print(f"  account {mismatch['account_id']}: balance {mismatch['balance']:.2f}, "
+                  f"ledger {mismatch['expected']:.2f}{' (repaired)' if mismatch['repaired'] else ''}")
+    if len(report.mismatches) > report.repaired:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
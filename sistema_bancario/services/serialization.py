@@ -0,0 +1,62 @@
+from typing import Any, Optional
+import orjson
+from fastapi.responses import Response
+from sqlalchemy import Executable, bindparam, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.database import Account, Transaction
+from services.balances import EFFECTIVE_BALANCE, EFFECTIVE_VERSION
+
+# Columns selected by the list endpoints, in response field order
+ACCOUNT_COLUMNS = (
+    Account.id,
+    Account.user_id,
+    Account.account_number,
+    EFFECTIVE_BALANCE,
+    Account.created_at,
+)
+TRANSACTION_COLUMNS = (
+    Transaction.id,
+    Transaction.account_id,
+    Transaction.transaction_type,
+    Transaction.amount,
+    Transaction.description,
+    Transaction.created_at,
+)
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered with orjson.
+
+    Returned directly from list endpoints so FastAPI skips response_model
+    validation; the content must already match the declared schema.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+# Built once, executed with the ids as parameters (see models.queries)
+ACCOUNT_ROW = select(*ACCOUNT_COLUMNS, EFFECTIVE_VERSION).where(Account.id == bindparam("account_id"))
+USER_ACCOUNT_ROWS = select(*ACCOUNT_COLUMNS).where(Account.user_id == bindparam("user_id"))
+
+
+async def fetch_rows(db: AsyncSession, stmt: Executable, params: Optional[dict] = None) -> list[dict]:
+    """
+    Execute a column select on the session's connection and return plain dicts.
+
+    Runs as a Core statement: no ORM entities are built and nothing is added
+    to the identity map.
+    """
+    conn = await db.connection()
+    result = await conn.execute(stmt, params)
+    keys = tuple(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+async def fetch_account_row(db: AsyncSession, account_id: int) -> Optional[dict]:
+    """Fetch the AccountResponse fields of an account plus its version"""
+    rows = await fetch_rows(db, ACCOUNT_ROW, {"account_id": account_id})
+    return rows[0] if rows else None
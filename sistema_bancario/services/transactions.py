@@ -0,0 +1,115 @@
+from datetime import datetime
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from domain.rules import DEFAULT_POLICY, RuleViolation, WithdrawalPolicy, check_amount, check_withdrawal_amount
+from models.database import Account, DailyLimit, Transaction, TransactionType, dialect_insert
+from services.balances import deposit_to_bucket, sweep_buckets
+from services.cache import ACCOUNT, record_change
+
+
+class TransactionRejected(Exception):
+    """Raised when a transaction violates one of the domain rules"""
+
+    def __init__(self, violation: RuleViolation):
+        super().__init__(violation.value)
+        self.violation = violation
+
+
+async def _register_withdrawal(db: AsyncSession, account_id: int, amount: float, policy: WithdrawalPolicy) -> bool:
+    """
+    Count a withdrawal in today's daily_limits row.
+
+    A single upsert both checks and increments the counter: the conflict
+    update only applies while the limit has not been reached, so an empty
+    RETURNING means the daily limit was hit.
+    """
+    insert = dialect_insert(db.bind)
+    stmt = insert(DailyLimit).values(
+        account_id=account_id,
+        day=datetime.utcnow().date(),
+        withdrawals=1,
+        withdrawn_amount=amount
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyLimit.account_id, DailyLimit.day],
+        set_={
+            "withdrawals": DailyLimit.withdrawals + 1,
+            "withdrawn_amount": DailyLimit.withdrawn_amount + stmt.excluded.withdrawn_amount,
+        },
+        where=DailyLimit.withdrawals < policy.daily_withdrawals
+    ).returning(DailyLimit.withdrawals)
+    result = await db.execute(stmt)
+    return result.first() is not None
+
+
+async def _update_balance(db: AsyncSession, account_id: int, delta: float) -> bool:
+    """
+    Apply a balance change in place.
+
+    Debits carry the balance check in the WHERE clause, so the check and the
+    update are atomic and no read-modify-write happens in Python.
+    """
+    stmt = (
+        update(Account)
+        .where(Account.id == account_id)
+        .values(balance=Account.balance + delta, version=Account.version + 1)
+        .returning(Account.balance)
+        .execution_options(synchronize_session=False)
+    )
+    if delta < 0:
+        stmt = stmt.where(Account.balance >= -delta)
+    result = await db.execute(stmt)
+    return result.first() is not None
+
+
+async def apply_transaction(
+    db: AsyncSession,
+    account_id: int,
+    transaction_type: TransactionType,
+    amount: float,
+    description: str = None,
+    policy: WithdrawalPolicy = DEFAULT_POLICY,
+    buckets: int = 0
+) -> Transaction:
+    """
+    Apply a deposit or withdrawal and record it, committing on success.
+
+    `buckets` is the account's balance_buckets: hot accounts take deposits
+    in a bucket row instead of the account row, and withdrawals sweep the
+    buckets into the account row when its own balance is not enough.
+
+    Raises TransactionRejected (after rolling back) when a rule is violated.
+    """
+    if transaction_type == TransactionType.WITHDRAWAL:
+        violation = check_withdrawal_amount(amount, policy)
+        if not violation and policy.daily_withdrawals is not None:
+            if not await _register_withdrawal(db, account_id, amount, policy):
+                violation = RuleViolation.DAILY_WITHDRAWALS
+        if not violation and not await _update_balance(db, account_id, -amount):
+            swept = buckets and await sweep_buckets(db, account_id)
+            if not (swept and await _update_balance(db, account_id, -amount)):
+                violation = RuleViolation.INSUFFICIENT_BALANCE
+    else:
+        violation = check_amount(amount)
+        if not violation:
+            if buckets:
+                await deposit_to_bucket(db, account_id, buckets, amount)
+            else:
+                await _update_balance(db, account_id, amount)
+
+    if violation:
+        await db.rollback()
+        raise TransactionRejected(violation)
+
+    new_transaction = Transaction(
+        account_id=account_id,
+        transaction_type=transaction_type,
+        amount=amount,
+        description=description
+    )
+    db.add(new_transaction)
+    await record_change(db, ACCOUNT, account_id)
+    await db.commit()
+    await db.refresh(new_transaction)
+    return new_transaction
@@ -0,0 +1,17 @@
+"""
+Test configuration.
+
+Tests run against a throwaway SQLite database, or against the database in
+BANKING_TEST_DATABASE_URL (e.g. Postgres, where the row-locking paths are
+exercised). The environment is set here, before the application modules
+read their settings.
+"""
+import os
+import tempfile
+
+_database_dir = tempfile.mkdtemp(prefix="banking-tests-")
+os.environ["BANKING_DATABASE_URL"] = (
+    os.environ.get("BANKING_TEST_DATABASE_URL") or f"sqlite+aiosqlite:///{_database_dir}/test.db"
+)
+os.environ.pop("BANKING_READ_DATABASE_URL", None)
+os.environ["BANKING_DATABASE_ECHO"] = "false"
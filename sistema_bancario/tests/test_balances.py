@@ -0,0 +1,66 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from models.database import (
+    Account, AsyncSessionLocal, BalanceBucket, TransactionType, User, engine, init_db, read_engine
+)
+from services.balances import effective_balance
+from services.transactions import TransactionRejected, apply_transaction
+
+
+async def _bucketed_account(buckets: dict[int, float]) -> int:
+    """Account with an empty account row and its money in the given buckets"""
+    name = uuid.uuid4().hex[:12]
+    async with AsyncSessionLocal() as db:
+        user = User(username=name, email=f"{name}@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        account = Account(user_id=user.id, account_number=name, balance=0.0, balance_buckets=len(buckets))
+        db.add(account)
+        await db.flush()
+        db.add_all(
+            BalanceBucket(account_id=account.id, bucket=bucket, balance=balance, version=1)
+            for bucket, balance in buckets.items()
+        )
+        await db.commit()
+        return account.id
+
+
+async def _withdraw(account_id: int, amount: float, buckets: int) -> bool:
+    async with AsyncSessionLocal() as db:
+        try:
+            await apply_transaction(db, account_id, TransactionType.WITHDRAWAL, amount, buckets=buckets)
+        except TransactionRejected:
+            return False
+        return True
+
+
+def test_concurrent_withdrawals_cannot_overdraw_bucketed_account():
+    async def scenario():
+        try:
+            await init_db()
+            account_id = await _bucketed_account({0: 60.0, 1: 40.0})
+            # Both need a sweep of the buckets; only one can be covered
+            results = await asyncio.gather(_withdraw(account_id, 80.0, 2), _withdraw(account_id, 80.0, 2))
+            async with AsyncSessionLocal() as db:
+                balance = await effective_balance(db, account_id)
+                bucket_balances = (await db.execute(
+                    select(BalanceBucket.balance).where(BalanceBucket.account_id == account_id)
+                )).scalars().all()
+                account_balance = (await db.execute(
+                    select(Account.balance).where(Account.id == account_id)
+                )).scalar_one()
+            return results, balance, bucket_balances, account_balance
+        finally:
+            await read_engine.dispose()
+            await engine.dispose()
+
+    results, balance, bucket_balances, account_balance = asyncio.run(scenario())
+
+    assert sorted(results) == [False, True]
+    assert balance == pytest.approx(20.0)
+    assert account_balance >= 0
+    assert all(bucket_balance >= 0 for bucket_balance in bucket_balances)
@@ -0,0 +1,30 @@
+from services import cache as cache_module
+from services.cache import LocalCache
+
+
+def test_fill_read_before_an_invalidation_is_refused():
+    cache = LocalCache(int)
+    read_at = cache_module._generation
+    # The row changes (and is invalidated) while the stale read is in flight
+    cache.invalidate(1)
+    cache.set(1, {"balance": 100.0}, read_at)
+    assert cache.get(1) is None
+
+    cache.set(1, {"balance": 50.0}, cache_module._generation)
+    assert cache.get(1) == {"balance": 50.0}
+
+
+def test_fill_of_another_key_is_kept():
+    cache = LocalCache(int)
+    read_at = cache_module._generation
+    cache.invalidate(2)
+    cache.set(1, {"balance": 100.0}, read_at)
+    assert cache.get(1) == {"balance": 100.0}
+
+
+def test_clear_refuses_fills_in_flight():
+    cache = LocalCache(int)
+    read_at = cache_module._generation
+    cache.clear()
+    cache.set(1, {"balance": 100.0}, read_at)
+    assert cache.get(1) is None